@@ -1,13 +1,32 @@
 import cv2
 import os
+import threading
+import time
+from collections import deque, namedtuple
 from datetime import datetime, timedelta
+from camera_input.frame_sources import open_source
+from pipeline.metrics import metrics
+
+default_buffer_size = 8
+
+# A buffered frame: capture sequence number, capture time (time.time()) and BGR image
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'image'])
 
 class CameraInput:
-    def __init__(self, camera_index=0, output_dir='screenshots'):
-        self.cap = cv2.VideoCapture(camera_index)
+    def __init__(self, camera_index=0, output_dir='screenshots', buffer_size=default_buffer_size):
+        self.cap = open_source(camera_index)
         self.output_dir = output_dir
         self.running = False
 
+        # Continuous capture state, see start_capture
+        self.frames = deque(maxlen=buffer_size)
+        self.frame_seq = 0
+        self.frame_cond = threading.Condition()
+        # cv2.VideoCapture is not safe to read from several threads
+        self.read_lock = threading.Lock()
+        self.capturing = False
+        self.capture_thread = None
+
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
@@ -23,7 +42,7 @@ class CameraInput:
                     tries += 1
                     continue
                 break
-            
+
             if not ret:
                 print("Failed to grab frame after 3 tries.")
                 exit()
@@ -39,26 +58,120 @@ class CameraInput:
         self.cap.release()
         cv2.destroyAllWindows()
 
+    def start_capture(self):
+        """Start a background thread that keeps the newest frames in a ring buffer."""
+        with self.frame_cond:
+            if self.capturing:
+                return
+            if not self.cap.isOpened():
+                print("Webcam is not open.")
+                return
+            self.capturing = True
 
-    def take_screenshot(self):
-        if not self.cap.isOpened():
-            print("Webcam is not open.")
-            return
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+        print(f"Started continuous capture (buffer size {self.frames.maxlen})")
+
+    def stop_capture(self):
+        self.capturing = False
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout=2)
+            self.capture_thread = None
 
-        tries = 0
-        while tries < 3:
-            ret, frame = self.cap.read()
+    def _capture_loop(self):
+        failures = 0
+        while self.capturing:
+            with self.read_lock:
+                ret, frame = self.cap.read()
             if not ret:
-                print("Failed to grab frame - %i", tries)
-                tries += 1
+                failures += 1
+                if failures % 30 == 1:
+                    print(f"Failed to grab frame - {failures}")
+                time.sleep(0.01)
                 continue
-            break
-
-        if ret:
-            timestamp = datetime.now().strftime("%m:%d~%H:%M:%S:%f")
-            filename = os.path.join(self.output_dir, f"screenshot {timestamp}.png")
-            cv2.imwrite(filename, frame)
-            print(f"Screenshot saved as {filename}")
-            return filename
+            failures = 0
+
+            with self.frame_cond:
+                self.frame_seq += 1
+                self.frames.append(Frame(self.frame_seq, time.time(), frame))
+                self.frame_cond.notify_all()
+
+    def get_latest_frame(self):
+        """Return the newest buffered Frame, or None if nothing has been captured yet."""
+        with self.frame_cond:
+            if not self.frames:
+                return None
+            return self.frames[-1]
+
+    def get_frame_after(self, timestamp, timeout=1.0):
+        """Return the oldest buffered Frame captured at or after timestamp.
+
+        Blocks up to timeout seconds for such a frame to arrive and returns
+        None if it doesn't.
+        """
+        def find():
+            for frame in self.frames:
+                if frame.timestamp >= timestamp:
+                    return frame
+            return None
+
+        with self.frame_cond:
+            found = None
+            deadline = time.time() + timeout
+            while found is None:
+                found = find()
+                remaining = deadline - time.time()
+                if found is not None or remaining <= 0:
+                    break
+                self.frame_cond.wait(remaining)
+            return found
+
+    @metrics.timed('capture')
+    def grab_frame(self):
+        """Return the current frame as an in-memory Frame without touching disk.
+
+        Uses the ring buffer when continuous capture is running, otherwise
+        reads the device directly. Returns None on failure.
+        """
+        if self.capturing:
+            latest = self.get_latest_frame()
+            if latest is None:
+                latest = self.get_frame_after(0)
+            return latest
+
+        if not self.cap.isOpened():
+            print("Webcam is not open.")
+            return None
+
+        with self.read_lock:
+            tries = 0
+            while tries < 3:
+                ret, frame = self.cap.read()
+                if not ret:
+                    print(f"Failed to grab frame - {tries}")
+                    tries += 1
+                    continue
+                break
+
+        if not ret:
+            return None
+
+        with self.frame_cond:
+            self.frame_seq += 1
+            return Frame(self.frame_seq, time.time(), frame)
+
+    @metrics.timed('png_write')
+    def save_frame(self, frame):
+        timestamp = datetime.now().strftime("%m:%d~%H:%M:%S:%f")
+        filename = os.path.join(self.output_dir, f"screenshot {timestamp}.png")
+        cv2.imwrite(filename, frame)
+        print(f"Screenshot saved as {filename}")
+        return filename
+
+    @metrics.timed('take_screenshot')
+    def take_screenshot(self):
+        frame = self.grab_frame()
+        if frame is not None:
+            return self.save_frame(frame.image)
         else:
-            print("!! Failed to take screenshot after 3 tries !!")    
\ No newline at end of file
+            print("!! Failed to take screenshot after 3 tries !!")
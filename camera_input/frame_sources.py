@@ -0,0 +1,103 @@
+import cv2
+import os
+import time
+import numpy as np
+
+class SyntheticSource:
+    """Fake camera that renders a moving box, for running without a webcam.
+
+    Exposes the subset of the cv2.VideoCapture API that CameraInput uses.
+    """
+
+    def __init__(self, width=640, height=480, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_index = 0
+        self.opened = True
+        self.last_read = 0.0
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+
+        _pace(self.last_read, self.fps)
+        self.last_read = time.time()
+
+        frame = np.full((self.height, self.width, 3), 40, dtype=np.uint8)
+        size = min(self.width, self.height) // 4
+        x = (self.frame_index * 4) % max(self.width - size, 1)
+        y = (self.height - size) // 2
+        cv2.rectangle(frame, (x, y), (x + size, y + size), (0, 200, 255), -1)
+        cv2.putText(frame, f"frame {self.frame_index}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        self.frame_index += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def release(self):
+        self.opened = False
+
+class VideoFileSource:
+    """Plays a video file as if it were a live camera.
+
+    Frames are paced at the file's frame rate and playback rewinds at the end
+    when loop is set.
+    """
+
+    def __init__(self, path, loop=True):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps == 0 or fps != fps:
+            fps = 30
+        self.fps = fps
+        self.last_read = 0.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        _pace(self.last_read, self.fps)
+        self.last_read = time.time()
+
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+def open_source(source):
+    """Open a camera index, video file path or 'synthetic' as a capture source."""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+
+    if source == 'synthetic':
+        return SyntheticSource()
+    if isinstance(source, str) and os.path.isfile(source):
+        return VideoFileSource(source)
+    return cv2.VideoCapture(source)
+
+def _pace(last_read, fps):
+    # Sleep until one frame period has passed since the previous read
+    wait = (1.0 / fps) - (time.time() - last_read)
+    if wait > 0:
+        time.sleep(wait)
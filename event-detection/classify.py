@@ -1,33 +1,238 @@
-from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
+from collections import OrderedDict
+import hashlib
+import os
+import sys
+import threading
+import numpy as np
 import torch
 
-processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+# Shared pipeline modules live at the repo root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline.model_registry import registry, load_blip_caption, load_clip
+from pipeline.metrics import metrics
+from pipeline.runtime import configure_torch, quantize_linear_int8
+
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model.to(device)
 
-def classify_pil_image(image: Image.Image):
-    try:
-        inputs = processor(image.convert("RGB"), return_tensors="pt").to(device)
-        out = model.generate(**inputs)
-        caption = processor.decode(out[0], skip_special_tokens=True).lower()
+# Captions are a handful of words; bounding generation keeps CPU latency predictable
+max_new_tokens = int(os.environ.get("BLIP_MAX_NEW_TOKENS", "20"))
+batch_size = int(os.environ.get("BLIP_BATCH_SIZE", "8"))
+cache_size = int(os.environ.get("BLIP_CACHE_SIZE", "128"))
 
-        print(f"[BLIP] Caption: {caption}")
+# "caption" generates a BLIP caption and keyword-matches it; "zero_shot" scores
+# the image against cached CLIP text embeddings of LABEL_PROMPTS
+BACKENDS = ("caption", "zero_shot")
+default_backend = os.environ.get("CLASSIFIER_BACKEND", "caption")
 
-        if "fire" in caption:
-            return "fire"
-        elif "crash" in caption or "accident" in caption or "wreck" in caption:
-            return "crash"
-        else:
-            return "none"
+LABEL_PROMPTS = {
+    "fire": ["a photo of a fire", "a building on fire", "flames and thick smoke"],
+    "crash": ["a photo of a car crash", "a car accident on the road", "a wrecked car"],
+    "none": ["a photo of a normal street", "people walking on a sidewalk",
+             "cars driving on a road", "an ordinary indoor scene"],
+}
+zero_shot_labels = list(LABEL_PROMPTS)
+
+# CLASSIFIER_OPTIMIZE=int8 quantizes the classifier's linear layers when running on CPU
+classifier_optimize = os.environ.get("CLASSIFIER_OPTIMIZE", "none")
+
+# BLIP_THREADS overrides INTRA_OP_THREADS for this process
+configure_torch(intra_op=os.environ.get("BLIP_THREADS"))
+
+def _optimize(model):
+    if classifier_optimize == "int8" and device == "cpu":
+        return quantize_linear_int8(model)
+    return model
+
+def _load_blip(cache_dir):
+    processor, model = load_blip_caption(cache_dir)
+    model = _optimize(model.to(device))
+    return processor, model
+
+def _warmup_blip(blip):
+    processor, model = blip
+    inputs = processor(Image.new("RGB", (384, 384)), return_tensors="pt").to(device)
+    with torch.inference_mode():
+        model.generate(**inputs, max_new_tokens=5)
+
+# BLIP is loaded from the local model cache on first use, not at import time
+registry.register('blip_caption', _load_blip, warmup=_warmup_blip)
+
+def get_blip():
+    return registry.get('blip_caption')
+
+def _load_clip(cache_dir):
+    processor, model = load_clip(cache_dir)
+    model = _optimize(model.to(device))
+
+    # The prompts never change, so their embeddings are computed once here;
+    # each label's prompts are averaged into one unit vector
+    prompts = [prompt for label in zero_shot_labels for prompt in LABEL_PROMPTS[label]]
+    inputs = processor(text=prompts, return_tensors="pt", padding=True).to(device)
+    with torch.inference_mode():
+        prompt_embeds = model.get_text_features(**inputs)
+    prompt_embeds = prompt_embeds / prompt_embeds.norm(dim=-1, keepdim=True)
+
+    label_embeds, start = [], 0
+    for label in zero_shot_labels:
+        embed = prompt_embeds[start:start + len(LABEL_PROMPTS[label])].mean(dim=0)
+        label_embeds.append(embed / embed.norm())
+        start += len(LABEL_PROMPTS[label])
+    return processor, model, torch.stack(label_embeds), model.logit_scale.exp().item()
+
+def _warmup_clip(clip):
+    processor, model, _, _ = clip
+    inputs = processor(images=Image.new("RGB", (224, 224)), return_tensors="pt").to(device)
+    with torch.inference_mode():
+        model.get_image_features(**inputs)
+
+registry.register('clip_zero_shot', _load_clip, warmup=_warmup_clip)
+
+def get_clip():
+    return registry.get('clip_zero_shot')
+
+def _to_pil(image):
+    # NumPy frames come from OpenCV, so they are BGR
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(np.ascontiguousarray(image[:, :, ::-1]))
+    return image.convert("RGB")
+
+def image_hash(image):
+    """Content hash of the RGB pixels; identical frames share a key"""
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(repr(image.size).encode())
+    return digest.hexdigest()
+
+class ImageCache:
+    """Small LRU of per-image results (captions, zero-shot labels) keyed by image hash"""
+
+    def __init__(self, name, max_entries=cache_size):
+        self.name = name
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            caption = self.entries.get(key)
+            if caption is None:
+                metrics.increment(f'{self.name}_cache_misses_total')
+                return None
+            self.entries.move_to_end(key)
+            metrics.increment(f'{self.name}_cache_hits_total')
+            return caption
+
+    def put(self, key, caption):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = caption
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
 
+caption_cache = ImageCache('caption')
+zero_shot_cache = ImageCache('zero_shot')
+
+@metrics.timed('blip_generate')
+def _generate(images):
+    processor, model = get_blip()
+    inputs = processor(images=images, return_tensors="pt").to(device)
+    with torch.inference_mode():
+        out = model.generate(**inputs, max_new_tokens=max_new_tokens, num_beams=1, do_sample=False)
+    return [caption.strip().lower() for caption in processor.batch_decode(out, skip_special_tokens=True)]
+
+@metrics.timed('clip_zero_shot')
+def _zero_shot(images):
+    processor, model, label_embeds, logit_scale = get_clip()
+    inputs = processor(images=images, return_tensors="pt").to(device)
+    with torch.inference_mode():
+        image_embeds = model.get_image_features(**inputs)
+        image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+        probs = (logit_scale * image_embeds @ label_embeds.T).softmax(dim=-1)
+    best = probs.argmax(dim=-1).tolist()
+    return [(zero_shot_labels[i], probs[row, i].item()) for row, i in enumerate(best)]
+
+def _cached_batches(images, cache, run):
+    # Serve hits from the cache and run the misses once each, batch_size at a time
+    pil_images = [_to_pil(image) for image in images]
+    keys = [image_hash(image) for image in pil_images]
+    results = [cache.get(key) for key in keys]
+
+    pending = OrderedDict()
+    for i, (key, result) in enumerate(zip(keys, results)):
+        if result is None:
+            pending.setdefault(key, pil_images[i])
+
+    todo = list(pending.items())
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        for (key, _), result in zip(chunk, run([image for _, image in chunk])):
+            cache.put(key, result)
+            pending[key] = result
+
+    return [result if result is not None else pending[key] for key, result in zip(keys, results)]
+
+def caption_images(images):
+    """
+    Caption several PIL images or BGR numpy frames with batched greedy BLIP decoding.
+
+    Frames already captioned are served from the cache, and duplicates in
+    one call are captioned once.
+
+    Returns:
+        list: one lowercase caption per image
+    """
+    return _cached_batches(images, caption_cache, _generate)
+
+def zero_shot_images(images):
+    """
+    Score PIL images or BGR numpy frames against the cached label prompt embeddings.
+
+    One CLIP vision forward pass per batch plus a dot product; no decoding.
+
+    Returns:
+        list: one (label, probability) tuple per image
+    """
+    return _cached_batches(images, zero_shot_cache, _zero_shot)
+
+def label_caption(caption):
+    if "fire" in caption:
+        return "fire"
+    elif "crash" in caption or "accident" in caption or "wreck" in caption:
+        return "crash"
+    else:
+        return "none"
+
+def classify_images(images, backend=None):
+    """Classify a list of PIL images or BGR numpy frames as "fire", "crash" or "none" ("error" on failure)"""
+    backend = backend or default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {backend}, expected one of {', '.join(BACKENDS)}")
+
+    try:
+        if backend == "zero_shot":
+            scored = zero_shot_images(images)
+        else:
+            captions = caption_images(images)
     except Exception as e:
-        print(f"[ERROR] BLIP classification failed: {e}")
-        return "error"
+        print(f"[ERROR] {backend} classification failed: {e}")
+        return ["error"] * len(images)
 
+    if backend == "zero_shot":
+        for label, prob in scored:
+            print(f"[CLIP] {label} ({prob:.2f})")
+        return [label for label, _ in scored]
 
-from server_connection import fetch_image_from_server
+    for caption in captions:
+        print(f"[BLIP] Caption: {caption}")
+    return [label_caption(caption) for caption in captions]
+
+def classify_pil_image(image: Image.Image, backend=None):
+    return classify_images([image], backend)[0]
+
+
+from server_connection import fetch_image_from_server, report_emergency
 def classify_remote_image(url):
     print('------------------------------------------------------------------------------')
     image = fetch_image_from_server(url)
@@ -38,5 +243,16 @@ def classify_remote_image(url):
 
     label = classify_pil_image(image)
     print(f"[CLASSIFY] Remote image classified as: {label}")
+    report_emergency(image, label)
     return label
 
+
+from server_connection import stream_frames
+def classify_stream(url, fps=1):
+    # One long-lived connection instead of a request per frame
+    for cv_image, meta in stream_frames(url, fps=fps):
+        print('------------------------------------------------------------------------------')
+        image = Image.fromarray(cv_image[:, :, ::-1])
+        label = classify_pil_image(image)
+        print(f"[CLASSIFY] Stream frame {meta.get('seq')} classified as: {label}")
+        report_emergency(image, label)
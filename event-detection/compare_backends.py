@@ -0,0 +1,62 @@
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+from classify import BACKENDS, classify_images
+from evaluate import default_video_dir, video_prediction, video_truth
+from pipeline.batch_loader import sample_frames
+
+# Same labelled video set as evaluate.py; "cc" videos are car crashes
+sources = [p for p in sorted(glob.glob(os.path.join(default_video_dir, '*.mp4'))) if video_truth(p)]
+labels = [video_truth(p) for p in sources]
+
+def evaluate(backend, videos, batch_size):
+    # Load and warm the model outside the timed section, on a frame that isn't in the set
+    classify_images([np.zeros((224, 224, 3), dtype=np.uint8)], backend)
+
+    correct_videos = correct_frames = total_frames = 0
+    elapsed = 0.0
+    for expected, frames in videos:
+        predicted = []
+        for start in range(0, len(frames), batch_size):
+            began = time.perf_counter()
+            predicted += classify_images(frames[start:start + batch_size], backend)
+            elapsed += time.perf_counter() - began
+        correct_videos += video_prediction(predicted) == expected
+        correct_frames += sum(label == expected for label in predicted)
+        total_frames += len(frames)
+
+    return {
+        'backend': backend,
+        'video_accuracy': correct_videos / len(videos),
+        'frame_accuracy': correct_frames / total_frames,
+        'frames': total_frames,
+        'ms_per_frame': 1000 * elapsed / total_frames,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the caption and zero-shot classifier backends")
+    parser.add_argument('--interval', type=float, default=0.5, help="Seconds between sampled frames")
+    parser.add_argument('--max-frames', type=int, default=20, help="Frames sampled per video")
+    parser.add_argument('--batch-size', type=int, default=1, help="Frames per classify call")
+    parser.add_argument('--output', help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    videos = [(label, sample_frames(source, args.interval, args.max_frames)) for source, label in zip(sources, labels)]
+    videos = [(label, frames) for label, frames in videos if frames]
+    print(f"Sampled {sum(len(f) for _, f in videos)} frames from {len(videos)} videos")
+
+    results = [evaluate(backend, videos, args.batch_size) for backend in BACKENDS]
+    print(f"{'backend':>10} {'video acc':>10} {'frame acc':>10} {'ms/frame':>10}")
+    for r in results:
+        print(f"{r['backend']:>10} {r['video_accuracy']:>10.2f} {r['frame_accuracy']:>10.2f} {r['ms_per_frame']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
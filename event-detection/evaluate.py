@@ -0,0 +1,165 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Shared pipeline modules live at the repo root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline.batch_loader import sample_frames
+
+CLASSES = ("fire", "crash", "none")
+default_video_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'video_files')
+
+def video_truth(path):
+    # Files are named fire*.mp4, cc*.mp4 (car crash) or none*.mp4
+    name = os.path.basename(path)
+    for prefix, label in (("fire", "fire"), ("cc", "crash"), ("none", "none")):
+        if name.startswith(prefix):
+            return label
+    return None
+
+def video_prediction(frame_labels):
+    # An emergency video counts as detected if any frame is; "none" needs every frame clean
+    emergencies = Counter(label for label in frame_labels if label in ("fire", "crash"))
+    return emergencies.most_common(1)[0][0] if emergencies else "none"
+
+def _init_worker(threads, backend):
+    # Classifier logs go to stderr so stdout carries only the JSON report
+    sys.stdout = sys.stderr
+    # Set before classify imports torch so each process stays inside its share of the cores
+    os.environ["BLIP_THREADS"] = str(threads)
+    os.environ["INTRA_OP_THREADS"] = str(threads)
+    if backend:
+        os.environ["CLASSIFIER_BACKEND"] = backend
+
+def evaluate_video(path, interval, max_frames, batch_size):
+    """Sample one video in memory and classify its frames in batches; runs in a pool process"""
+    from classify import classify_images
+
+    start = time.perf_counter()
+    frames = sample_frames(path, interval, max_frames)
+    decode_seconds = time.perf_counter() - start
+
+    predictions, batch_seconds = [], []
+    for i in range(0, len(frames), batch_size):
+        start = time.perf_counter()
+        predictions += classify_images(frames[i:i + batch_size])
+        batch_seconds.append(time.perf_counter() - start)
+
+    return {
+        'video': os.path.basename(path),
+        'truth': video_truth(path),
+        'predictions': predictions,
+        'decode_seconds': decode_seconds,
+        'classify_seconds': sum(batch_seconds),
+        'batch_seconds': batch_seconds,
+    }
+
+def confusion_matrix(pairs):
+    """{truth: {prediction: count}} over (truth, prediction) pairs"""
+    predicted = sorted({p for _, p in pairs} - set(CLASSES))
+    matrix = {t: {p: 0 for p in CLASSES + tuple(predicted)} for t in CLASSES}
+    for truth, prediction in pairs:
+        matrix[truth][prediction] += 1
+    return matrix
+
+def class_scores(matrix):
+    scores = {}
+    for c in CLASSES:
+        tp = matrix[c][c]
+        predicted = sum(row[c] for row in matrix.values())
+        actual = sum(matrix[c].values())
+        scores[c] = {
+            'precision': tp / predicted if predicted else None,
+            'recall': tp / actual if actual else None,
+            'support': actual,
+        }
+    return scores
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+def summarize(results, wall_seconds, batch_size):
+    frame_pairs = [(r['truth'], p) for r in results for p in r['predictions']]
+    video_pairs = [(r['truth'], video_prediction(r['predictions'])) for r in results]
+    frame_matrix = confusion_matrix(frame_pairs)
+    video_matrix = confusion_matrix(video_pairs)
+    frames = len(frame_pairs)
+    batch_ms = [1000 * s for r in results for s in r['batch_seconds']]
+
+    return {
+        'videos': len(results),
+        'frames': frames,
+        'wall_seconds': wall_seconds,
+        'frames_per_second': frames / wall_seconds if wall_seconds else None,
+        'frame_accuracy': sum(t == p for t, p in frame_pairs) / frames if frames else None,
+        'video_accuracy': sum(t == p for t, p in video_pairs) / len(video_pairs) if video_pairs else None,
+        'frame_scores': class_scores(frame_matrix),
+        'video_scores': class_scores(video_matrix),
+        'frame_confusion': frame_matrix,
+        'video_confusion': video_matrix,
+        # Stage time summed over workers, per frame; wall time above reflects the parallelism
+        'stage_latency_ms': {
+            'decode_per_frame': 1000 * sum(r['decode_seconds'] for r in results) / max(frames, 1),
+            'classify_per_frame': 1000 * sum(r['classify_seconds'] for r in results) / max(frames, 1),
+            'classify_batch_p50': _percentile(batch_ms, 50),
+            'classify_batch_p95': _percentile(batch_ms, 95),
+            'batch_size': batch_size,
+        },
+        'per_video': [{'video': r['video'], 'truth': r['truth'], 'prediction': video_prediction(r['predictions']),
+                       'frames': len(r['predictions']), 'labels': dict(Counter(r['predictions']))}
+                      for r in results],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify the labelled video set in parallel and report accuracy and throughput")
+    parser.add_argument('--videos', default=default_video_dir, help="Directory of fire*/cc*/none* .mp4 files")
+    parser.add_argument('--workers', type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument('--interval', type=float, default=0.5, help="Seconds between sampled frames")
+    parser.add_argument('--max-frames', type=int, help="Frames sampled per video (default: all)")
+    parser.add_argument('--batch-size', type=int, default=8, help="Frames per classifier call")
+    parser.add_argument('--backend', help="Classifier backend (caption or zero_shot)")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--min-accuracy', type=float, help="Exit non-zero if frame accuracy is below this")
+    args = parser.parse_args()
+
+    paths = [p for p in sorted(glob.glob(os.path.join(args.videos, '*.mp4'))) if video_truth(p)]
+    if not paths:
+        raise ValueError(f"No labelled videos in {args.videos}")
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads, args.backend)) as pool:
+        futures = [pool.submit(evaluate_video, path, args.interval, args.max_frames, args.batch_size)
+                   for path in paths]
+        results = [future.result() for future in futures]
+    if not any(r['predictions'] for r in results):
+        raise ValueError(f"No frames could be sampled from the videos in {args.videos}")
+    report = summarize(results, time.perf_counter() - start, args.batch_size)
+    report['settings'] = {'workers': args.workers, 'threads_per_worker': threads, 'interval': args.interval,
+                          'max_frames': args.max_frames, 'backend': args.backend or 'default'}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f"Frame accuracy {report['frame_accuracy']:.2f}, video accuracy {report['video_accuracy']:.2f}, "
+              f"{report['frames_per_second']:.1f} frames/s -> {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.min_accuracy is not None and (report['frame_accuracy'] or 0) < args.min_accuracy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
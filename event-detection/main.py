@@ -1,10 +1,15 @@
-from classify import classify_remote_image
+from classify import classify_stream
+import requests
 import time
 
 def main():
     while (True):
-        url = "https://6285-2607-f140-400-68-c90d-840b-94de-89bc.ngrok-free.app/screenshot_full"
-        classify_remote_image(url)
+        url = "https://6285-2607-f140-400-68-c90d-840b-94de-89bc.ngrok-free.app/stream_full"
+        try:
+            classify_stream(url, fps=1)
+        except requests.RequestException as req_err:
+            print(f"[SERVER] Stream failed: {req_err}")
+        # Reconnect after the stream drops
         time.sleep(1)
 
-main()
\ No newline at end of file
+main()
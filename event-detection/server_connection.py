@@ -5,27 +5,50 @@ from io import BytesIO
 from PIL import Image
 import cv2
 import numpy as np
-from classify import classify_pil_image
 
-import requests
 import msgpack
-import base64
-import os
+import struct
+
+def decode_image(img_field):
+    # Protocol v2 sends raw bytes; v1 sends a base64 string
+    if isinstance(img_field, str):
+        img_field = base64.b64decode(img_field)
+    return cv2.imdecode(np.frombuffer(img_field, dtype=np.uint8), cv2.IMREAD_COLOR)
 
 def decode_screenshot_response(response_bytes):
-    unpacked = msgpack.unpackb(response_bytes, raw=False)
-    img_b64 = unpacked.get("image")
-    img_bytes = base64.b64decode(img_b64)
+    """
+    Decodes a /screenshot_full response into a BGR image in memory.
+
+    Args:
+        response_bytes (bytes): msgpack body in either protocol version.
 
-    image_path = "decoded_screenshot.jpg"
-    with open(image_path, "wb") as f:
-        f.write(img_bytes)
+    Returns:
+        tuple: (BGR numpy image, location string)
+    """
+    unpacked = msgpack.unpackb(response_bytes, raw=False)
+    image = decode_image(unpacked.get("image"))
 
     loc = unpacked.get("loc")
     print("Location:", loc)
-    print(f"Image saved to {image_path}")
 
-    return image_path, loc
+    return image, loc
+
+def decode_detections_response(response_bytes, key):
+    """
+    Decodes a protocol v2 /screenshot_people or /screenshot_weapons response.
+
+    Args:
+        response_bytes (bytes): msgpack body.
+        key (str): 'people' or 'weapons'.
+
+    Returns:
+        list: dicts with 'image' (BGR numpy image), 'box', 'confidence', 'class' and 'timestamp'.
+    """
+    unpacked = msgpack.unpackb(response_bytes, raw=False)
+    detections = unpacked.get(key, [])
+    for detection in detections:
+        detection["image"] = decode_image(detection["image"])
+    return detections
 
 def image_to_base64(image: Image.Image, format: str = 'JPEG') -> str:
     """
@@ -46,38 +69,75 @@ def image_to_base64(image: Image.Image, format: str = 'JPEG') -> str:
     return base64_str
     
 
+def report_emergency(img, label):
+    if label in ["fire", "crash"]:
+        send_url = "https://42f2-2607-f140-400-49-75cb-ca8-db44-2ce3.ngrok-free.app/api/emergency-detection-base64"
+        try:
+            response = requests.post(send_url, data=image_to_base64(img), timeout=10)
+            if response.status_code == 200:
+                print(f"[SERVER] Emergency '{label}' data sent successfully.")
+            else:
+                print(f"[SERVER] POST failed with status {response.status_code}: {response.text}")
+        except Exception as e:
+            print(f"[ERROR] Error sending emergency POST: {e}")
+    else:
+        print(f"[INFO] No emergency detected (label: {label}) — not sending.")
+
+def _read_exact(raw, size):
+    data = b""
+    while len(data) < size:
+        chunk = raw.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def stream_frames(url, fps=1, **params):
+    """
+    Yields frames from the server's /stream_full endpoint over one connection.
+
+    Args:
+        url (str): The /stream_full URL.
+        fps (float): Frame rate to ask the server for.
+        **params: Extra query parameters (format, quality, max_edge, max_frames).
+
+    Yields:
+        tuple: (BGR numpy image, metadata dict with 'timestamp', 'seq', 'loc')
+    """
+    params = dict(params, mode="msgpack", fps=fps)
+    with requests.get(url, params=params, stream=True, timeout=(10, 30)) as response:
+        response.raise_for_status()
+        while True:
+            header = _read_exact(response.raw, 4)
+            if header is None:
+                print("[SERVER] Stream ended.")
+                return
+            (length,) = struct.unpack(">I", header)
+            body = _read_exact(response.raw, length)
+            if body is None:
+                print("[SERVER] Stream ended mid-frame.")
+                return
+            unpacked = msgpack.unpackb(body, raw=False)
+            image = decode_image(unpacked.pop("image"))
+            yield image, unpacked
+
 def fetch_image_from_server(url):
     try:
         print("[SERVER] Sending GET request...")
-        response = requests.get(url, timeout=10)
+        # Ask for protocol v2 so the image arrives as raw bytes instead of base64
+        response = requests.get(url, params={"v": 2}, timeout=10)
         response.raise_for_status()
 
         if response.status_code == 200:
-            imgpath, loc = decode_screenshot_response(response.content)
+            cv_image, loc = decode_screenshot_response(response.content)
         else:
             print(f"[ERROR] Failed to get screenshot: {response.status_code}")
 
-        cv_image = cv2.imread(imgpath)
         cv2.imshow("Live Emergency Feed", cv_image)
         cv2.waitKey(1)
 
-        img = Image.open(imgpath)
-        
-        label = classify_pil_image(img)
-        if label in ["fire", "crash"]:
-            send_url = "https://42f2-2607-f140-400-49-75cb-ca8-db44-2ce3.ngrok-free.app/api/emergency-detection-base64"
-            try:
-                response = requests.post(send_url, data=image_to_base64(img), timeout=10)
-                if response.status_code == 200:
-                    print(f"[SERVER] Emergency '{label}' data sent successfully.")
-                else:
-                    print(f"[SERVER] POST failed with status {response.status_code}: {response.text}")
-            except Exception as e:
-                print(f"[ERROR] Error sending emergency POST: {e}")
-        else:
-            print(f"[INFO] No emergency detected (label: {label}) — not sending.")
-
-        return img
+        # Classification and reporting happen in the caller, once per poll
+        return Image.fromarray(cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB))
 
     except requests.RequestException as req_err:
         print(f"[SERVER] Request failed: {req_err}")
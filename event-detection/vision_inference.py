@@ -4,12 +4,16 @@ import base64
 import os
 import cv2
 import time
-from classify import classify_image_with_blip
+from classify import classify_pil_image
+
+def classify_image_with_blip(image_path):
+    return classify_pil_image(Image.open(image_path))
 
 def alert_emergency(label, image_path):
     print(f"[ALERT] Detected {label.upper()} in frame: {image_path}")
 
-def extract_and_classify(source=0, output_dir='extracted_images', interval=0.5):
+def extract_and_classify(source=0, output_dir='extracted_images', interval=0.5, motion_gate=None):
+    # Pass a pipeline.motion_gate.MotionGate to skip BLIP on frames where the scene hasn't changed
     output = []
 
     os.makedirs(output_dir, exist_ok=True)
@@ -40,7 +44,12 @@ def extract_and_classify(source=0, output_dir='extracted_images', interval=0.5):
             cv2.imwrite(filename, frame)
             print(f"[INFO] Saved {filename}")
 
-            label = classify_image_with_blip(filename)
+            if motion_gate is not None:
+                label, ran = motion_gate.gate(frame, lambda _: classify_image_with_blip(filename))
+                if not ran:
+                    print(f"[GATE] Frame {saved_count:04d} unchanged, reusing previous label")
+            else:
+                label = classify_image_with_blip(filename)
             print(f"[CLASSIFY] Frame {saved_count:04d}: {label}")
 
 
@@ -60,6 +69,9 @@ def extract_and_classify(source=0, output_dir='extracted_images', interval=0.5):
 
     cap.release()
     print("[INFO] Stream ended.")
+    if motion_gate is not None:
+        print(f"[GATE] Skipped {motion_gate.skipped}/{motion_gate.frames} frames "
+              f"(skip ratio {motion_gate.skip_ratio:.2f})")
     return output
 
 
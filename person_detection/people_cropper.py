@@ -1,6 +1,10 @@
 import cv2
 import os
 import numpy as np
+from pipeline.batch_loader import iter_batches, list_images, load_image
+from pipeline.detections import filter_detections
+from pipeline.metrics import metrics
+from pipeline.runtime import configure_opencv
 
 default_net_file= 'person_detection/deploy.prototxt'  
 default_caffe_model='person_detection/mobilenet_iter_73000.caffemodel'  
@@ -12,9 +16,28 @@ CLASSES = ('background',
            'cow', 'diningtable', 'dog', 'horse',
            'motorbike', 'person', 'pottedplant',
            'sheep', 'sofa', 'train', 'tvmonitor')
+PERSON_CLASS_ID = CLASSES.index('person')
+
+# OpenCV DNN backend and target, e.g. SSD_BACKEND=openvino or SSD_TARGET=opencl_fp16
+DNN_BACKENDS = {
+    'default': cv2.dnn.DNN_BACKEND_DEFAULT,
+    'opencv': cv2.dnn.DNN_BACKEND_OPENCV,
+    'openvino': cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+    'cuda': cv2.dnn.DNN_BACKEND_CUDA,
+}
+DNN_TARGETS = {
+    'cpu': cv2.dnn.DNN_TARGET_CPU,
+    'opencl': cv2.dnn.DNN_TARGET_OPENCL,
+    'opencl_fp16': cv2.dnn.DNN_TARGET_OPENCL_FP16,
+    'cuda': cv2.dnn.DNN_TARGET_CUDA,
+    'cuda_fp16': cv2.dnn.DNN_TARGET_CUDA_FP16,
+}
+default_dnn_backend = os.environ.get("SSD_BACKEND", "default")
+default_dnn_target = os.environ.get("SSD_TARGET", "cpu")
 
 class PeopleCropper:
-    def __init__(self, net_file = default_net_file, caffe_model = default_caffe_model, output_dir = default_output_dir):
+    def __init__(self, net_file = default_net_file, caffe_model = default_caffe_model, output_dir = default_output_dir,
+                 backend = default_dnn_backend, target = default_dnn_target):
         self.net_file = net_file
         self.caffe_model = caffe_model
         self.output_dir = output_dir
@@ -30,7 +53,13 @@ class PeopleCropper:
             os.makedirs(output_dir)
 
         # Use OpenCV DNN instead of Caffe
+        configure_opencv()
         self.net = cv2.dnn.readNetFromCaffe(net_file, caffe_model)
+        if backend not in DNN_BACKENDS or target not in DNN_TARGETS:
+            raise ValueError(f"Unknown DNN backend/target {backend}/{target}, expected one of "
+                             f"{', '.join(DNN_BACKENDS)} / {', '.join(DNN_TARGETS)}")
+        self.net.setPreferableBackend(DNN_BACKENDS[backend])
+        self.net.setPreferableTarget(DNN_TARGETS[target])
 
     def _preprocess(self, src):
         img = cv2.resize(src, (300,300))
@@ -45,54 +74,91 @@ class PeopleCropper:
 
         cls = out['detection_out'][0,0,:,1]
         conf = out['detection_out'][0,0,:,2]
-        return (box.astype(np.int32), conf, cls)
+        # Class, confidence, size and clipping in one masked pass
+        return filter_detections(box, conf, cls, [PERSON_CLASS_ID], 0.1, img.shape)
 
-    def _detect(self, imgfile):
-        origimg = cv2.imread(imgfile)
-        
-        # Let OpenCV handle preprocessing
-        blob = cv2.dnn.blobFromImage(origimg, 0.007843, (300, 300), 127.5)
+    def _detect_batch(self, origimgs):
+        # One forward pass for the whole batch; blobFromImages resizes each image
+        blob = cv2.dnn.blobFromImages(origimgs, 0.007843, (300, 300), 127.5)
         
         self.net.setInput(blob)
-        out = self.net.forward()
-        
-        # Reshape output to match expected format
-        out = {'detection_out': out.reshape(1, 1, -1, 7)}
-        
-        box, conf, cls = self._postprocess(origimg, out)
-
-        # Get all detected people
-        people_crops = []
-        for i in range(len(box)):
-            classification = CLASSES[int(cls[i])]
-            if classification == 'person' and conf[i] > 0.1:
-                x1, y1, x2, y2 = box[i]
-                cropped_img = origimg[y1:y2, x1:x2]
-                people_crops.append((cropped_img, conf[i]))
-        
-        return people_crops
+        out = self.net.forward().reshape(-1, 7)
+
+        # Column 0 of each detection row is the index of its image in the batch
+        return [self._postprocess(origimg, {'detection_out': out[out[:, 0] == i].reshape(1, 1, -1, 7)})
+                for i, origimg in enumerate(origimgs)]
+
+    def _detect(self, origimg):
+        return self._detect_batch([origimg])[0]
+
+    def detect_boxes(self, frame):
+        """
+        Detect people in a BGR image without cropping
+
+        Returns a structured array of pipeline.detections.detection_dtype.
+        """
+        return self._detect(frame)
+
+    @metrics.timed('people_detect')
+    def detect_array(self, frame):
+        """
+        Detect people in an in-memory BGR image
+
+        Returns a list of dicts with keys 'image' (the crop), 'box'
+        (x1, y1, x2, y2), 'confidence' and 'class'. Boxes are clipped to
+        the image and crops smaller than 10px on either side are dropped.
+        """
+        return self._to_crops(frame, self._detect(frame))
+
+    @metrics.timed('people_detect_batch')
+    def detect_batch(self, frames):
+        """
+        Detect people in a list of BGR images and/or image paths in one forward pass
+
+        Returns one detect_array-style crop list per input.
+        """
+        frames = [load_image(f) for f in frames]
+        return [self._to_crops(frame, detections)
+                for frame, detections in zip(frames, self._detect_batch(frames))]
+
+    def _to_crops(self, origimg, detections):
+        crops = []
+        for (x1, y1, x2, y2), confidence in zip(detections['box'].tolist(), detections['confidence'].tolist()):
+            crops.append({
+                'image': origimg[y1:y2, x1:x2],
+                'box': (x1, y1, x2, y2),
+                'confidence': confidence,
+                'class': 'person',
+            })
+        return crops
+
+    def save_crops(self, crops, name):
+        """Write crops from detect_array under output_dir/name and return their paths"""
+        image_output_dir = os.path.join(self.output_dir, name)
+        os.makedirs(image_output_dir, exist_ok=True)
+
+        output_filenames = []
+        for i, crop in enumerate(crops):
+            output_filename = f"{image_output_dir}/person_{i}_conf_{crop['confidence']:.2f}.jpg"
+            cv2.imwrite(output_filename, crop['image'], [cv2.IMWRITE_JPEG_QUALITY, 100])
+            print(f"Saved: {output_filename}")
+            output_filenames.append(output_filename)
+        return output_filenames
 
-    def detect_dir(self, directory):
-        for f in os.listdir(directory):
-            self.detect(directory + "/" + f)
+    def detect_dir(self, directory, batch_size=8):
+        # Decoding of the next batch overlaps with inference on the current one
+        for names, frames in iter_batches(list_images(directory), batch_size):
+            for name, people_crops in zip(names, self.detect_batch(frames)):
+                if people_crops:
+                    self.save_crops(people_crops, os.path.basename(name))
             
+    @metrics.timed('people_detect_file')
     def detect(self, filepath):
-        people_crops = self._detect(filepath)
+        origimg = cv2.imread(filepath)
+        people_crops = self.detect_array(origimg)
         
         if people_crops:
             # Create output subdirectory for this image
             filename = filepath.split('/')[-1]
             print(filename)
-            image_output_dir = os.path.join(self.output_dir, filename)
-            os.makedirs(image_output_dir, exist_ok=True)
-
-            output_filenames = []
-            for i, (cropped, confidence) in enumerate(people_crops):
-                if cropped.shape[0] < 10 or cropped.shape[1] < 10:
-                    print(f"Skipping person {i} - too small")
-                    continue
-                output_filename = f"{image_output_dir}/person_{i}_conf_{confidence:.2f}.jpg"
-                cv2.imwrite(output_filename, cropped, [cv2.IMWRITE_JPEG_QUALITY, 100])
-                print(f"Saved: {output_filename}")
-                output_filenames.append(output_filename)
-            return output_filenames 
\ No newline at end of file
+            return self.save_crops(people_crops, filename)
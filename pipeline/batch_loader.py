@@ -0,0 +1,81 @@
+import cv2
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+image_extensions = (".jpg", ".jpeg", ".png")
+
+def load_image(item):
+    """Return item as a BGR array, reading it from disk if it is a path"""
+    if isinstance(item, str):
+        return cv2.imread(item)
+    return item
+
+def list_images(directory):
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if f.lower().endswith(image_extensions))
+
+def sample_frames(source, interval=0.5, max_frames=None):
+    """
+    Decode one frame every interval seconds of a video into memory
+
+    Frames in between are grabbed but not decoded. Returns an empty list if
+    the source can't be opened.
+    """
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps == 0 or fps != fps:
+        fps = 30
+    step = max(int(fps * interval), 1)
+
+    frames = []
+    index = 0
+    while max_frames is None or len(frames) < max_frames:
+        if index % step == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        elif not cap.grab():
+            break
+        index += 1
+    cap.release()
+    return frames
+
+def iter_batches(items, batch_size=8, num_workers=4):
+    """
+    Yield (names, frames) batches while the next batch decodes in the background
+
+    Args:
+        items: list of image paths and/or BGR arrays
+        batch_size: number of frames per yielded batch
+        num_workers: decoder threads (cv2.imread releases the GIL)
+
+    Paths that fail to decode are skipped. Arrays are named by their index.
+    """
+    chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    if not chunks:
+        return
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        def submit(chunk_index):
+            offset = chunk_index * batch_size
+            return [(item if isinstance(item, str) else offset + i, pool.submit(load_image, item))
+                    for i, item in enumerate(chunks[chunk_index])]
+
+        pending = submit(0)
+        for chunk_index in range(len(chunks)):
+            # Queue the next batch before handing this one to inference
+            upcoming = submit(chunk_index + 1) if chunk_index + 1 < len(chunks) else None
+
+            names, frames = [], []
+            for name, future in pending:
+                frame = future.result()
+                if frame is None:
+                    print(f"Could not read image: {name}")
+                    continue
+                names.append(name)
+                frames.append(frame)
+            if frames:
+                yield names, frames
+
+            pending = upcoming
@@ -0,0 +1,51 @@
+import argparse
+import time
+import cv2
+from pipeline.encoding import EncodingPolicy
+
+# Run from the repo root: python -m pipeline.benchmark_encoding
+default_image = 'test-data/city.jpg'
+
+settings = [
+    EncodingPolicy('png'),
+    EncodingPolicy('jpeg', quality=100),
+    EncodingPolicy('jpeg', quality=95),
+    EncodingPolicy('jpeg', quality=85),
+    EncodingPolicy('jpeg', quality=75),
+    EncodingPolicy('jpeg', quality=60),
+    EncodingPolicy('webp', quality=90),
+    EncodingPolicy('webp', quality=80),
+    EncodingPolicy('webp', quality=60),
+    EncodingPolicy('jpeg', quality=85, max_edge=1280),
+    EncodingPolicy('jpeg', quality=85, max_edge=640),
+    EncodingPolicy('webp', quality=80, max_edge=640),
+]
+
+def benchmark(img, policy, runs):
+    policy.encode(img)  # warm up codec
+    start = time.perf_counter()
+    for _ in range(runs):
+        encoded = policy.encode(img)
+    return (time.perf_counter() - start) / runs, len(encoded)
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode time and size per frame for each encoding setting")
+    parser.add_argument('--image', default=default_image)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        raise ValueError(f"Could not read image: {args.image}")
+    print(f"{args.image}: {img.shape[1]}x{img.shape[0]}, {args.runs} runs per setting")
+
+    _, baseline_bytes = benchmark(img, EncodingPolicy('jpeg', quality=100), 1)
+    print(f"{'format':<6} {'quality':>7} {'max_edge':>8} {'ms/frame':>9} {'KB/frame':>9} {'vs q100':>8}")
+    for policy in settings:
+        seconds, size = benchmark(img, policy, args.runs)
+        quality = policy.quality if policy.format != 'png' else '-'
+        print(f"{policy.format:<6} {quality:>7} {str(policy.max_edge or '-'):>8} "
+              f"{seconds * 1000:>9.2f} {size / 1024:>9.1f} {size / baseline_bytes:>8.2f}")
+
+if __name__ == '__main__':
+    main()
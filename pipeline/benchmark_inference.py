@@ -0,0 +1,177 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+import cv2
+import numpy as np
+from pipeline.batch_loader import sample_frames
+from pipeline.tracker import iou_matrix
+
+# Run from the repo root: python -m pipeline.benchmark_inference
+default_image = 'test-data/city.jpg'
+default_videos = 'event-detection/video_files'
+
+# Each setting runs in its own process so thread settings and quantization
+# don't leak between runs; the first setting per model is the baseline
+settings = {
+    'people': [
+        {},
+        {'OPENCV_THREADS': '1'},
+        {'OPENCV_THREADS': '2'},
+        {'SSD_BACKEND': 'opencv', 'SSD_TARGET': 'opencl'},
+    ],
+    'weapons': [
+        {},
+        {'INTRA_OP_THREADS': '2', 'INTER_OP_THREADS': '1'},
+        {'WEAPON_IMG_SIZE': '416'},
+        {'WEAPON_IMG_SIZE': '320'},
+    ],
+    'pose': [
+        {},
+        {'INTRA_OP_THREADS': '2', 'INTER_OP_THREADS': '1'},
+    ],
+    'classifier': [
+        {},
+        {'CLASSIFIER_OPTIMIZE': 'int8'},
+        {'CLASSIFIER_OPTIMIZE': 'int8', 'INTRA_OP_THREADS': '2', 'INTER_OP_THREADS': '1'},
+        {'CLASSIFIER_BACKEND': 'zero_shot'},
+        {'CLASSIFIER_BACKEND': 'zero_shot', 'CLASSIFIER_OPTIMIZE': 'int8'},
+    ],
+}
+
+def video_label(path):
+    # Files are named fire*.mp4, cc*.mp4 (car crash) or none*.mp4
+    name = os.path.basename(path)
+    for prefix, label in (('fire', 'fire'), ('cc', 'crash'), ('none', 'none')):
+        if name.startswith(prefix):
+            return label
+    return None
+
+def load_model(model):
+    """Return predict(list of BGR frames) -> list of JSON-serializable predictions"""
+    if model == 'people':
+        from person_detection.people_cropper import PeopleCropper
+        detector = PeopleCropper(output_dir='/tmp/benchmark_people')
+        return lambda frames: [detector.detect_boxes(f)['box'].tolist() for f in frames]
+    if model == 'weapons':
+        from weapon_detection.weapon_detector import WeaponDetector
+        detector = WeaponDetector(output_dir='/tmp/benchmark_weapons')
+        return lambda frames: [detector.detect_boxes(f)['box'].tolist() for f in frames]
+    if model == 'pose':
+        sys.path.append('pose-detection')
+        from collapse_detector import CollapseDetector
+        detector = CollapseDetector()
+        return lambda frames: [detector.detect_pose(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)).tolist() for f in frames]
+    if model == 'classifier':
+        sys.path.append('event-detection')
+        from classify import classify_images
+        return classify_images
+    raise ValueError(f"Unknown model {model}")
+
+def worker(model, image_path, video_dir, runs, frames_per_video):
+    """Time one model under the current environment and print the results as JSON"""
+    with contextlib.redirect_stdout(sys.stderr):
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        videos = sorted(glob.glob(os.path.join(video_dir, '*.mp4')))
+        frames, labels = [], []
+        for path in videos:
+            sampled = sample_frames(path, interval=1.0, max_frames=frames_per_video)
+            frames += sampled
+            labels += [video_label(path)] * len(sampled)
+
+        predict = load_model(model)
+        predict([image])  # load and warm up
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            image_prediction = predict([image])[0]
+        image_ms = 1000 * (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        predictions = [predict([frame])[0] for frame in frames]
+        frame_ms = 1000 * (time.perf_counter() - start) / max(len(frames), 1)
+
+    print(json.dumps({'image_ms': image_ms, 'frame_ms': frame_ms, 'image_prediction': image_prediction,
+                      'predictions': predictions, 'labels': labels}))
+
+def box_agreement(baseline, predicted):
+    # F1 of boxes matched to the baseline at IoU >= 0.5
+    matched = total = 0
+    for base, pred in zip(baseline, predicted):
+        total += len(base) + len(pred)
+        if base and pred:
+            ious = iou_matrix(base, pred)
+            matched += 2 * min(int((ious.max(axis=1) >= 0.5).sum()), int((ious.max(axis=0) >= 0.5).sum()))
+    return matched / total if total else 1.0
+
+def agreement(model, baseline, result):
+    if model in ('people', 'weapons'):
+        return box_agreement([baseline['image_prediction']] + baseline['predictions'],
+                             [result['image_prediction']] + result['predictions'])
+    if model == 'pose':
+        # Fraction of keypoints within 2% of the frame of the baseline position
+        base = np.array(baseline['predictions'])
+        pred = np.array(result['predictions'])
+        return float(np.mean(np.abs(base - pred).max(axis=-1) < 0.02)) if base.size else 1.0
+    same = sum(a == b for a, b in zip(baseline['predictions'], result['predictions']))
+    return same / max(len(result['predictions']), 1)
+
+def accuracy(model, result):
+    if model != 'classifier' or not result['labels']:
+        return None
+    return sum(p == l for p, l in zip(result['predictions'], result['labels'])) / len(result['labels'])
+
+def run_setting(model, env, args):
+    command = [sys.executable, '-m', 'pipeline.benchmark_inference', '--worker', model,
+               '--image', args.image, '--videos', args.videos, '--runs', str(args.runs),
+               '--frames-per-video', str(args.frames_per_video)]
+    completed = subprocess.run(command, env=dict(os.environ, **env), stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and accuracy per model optimization setting")
+    parser.add_argument('--models', default=','.join(settings), help="Comma-separated subset of " + ', '.join(settings))
+    parser.add_argument('--image', default=default_image)
+    parser.add_argument('--videos', default=default_videos)
+    parser.add_argument('--runs', type=int, default=10, help="Timed runs on the image")
+    parser.add_argument('--frames-per-video', type=int, default=3)
+    parser.add_argument('--output', help="Also write the results as JSON here")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.image, args.videos, args.runs, args.frames_per_video)
+        return
+
+    rows = []
+    print(f"{'model':<11} {'setting':<60} {'ms/image':>9} {'ms/frame':>9} {'agree':>6} {'acc':>6}")
+    for model in args.models.split(','):
+        baseline = None
+        for env in settings[model]:
+            label = ' '.join(f'{k}={v}' for k, v in env.items()) or 'default'
+            result = run_setting(model, env, args)
+            if result is None:
+                print(f"{model:<11} {label:<60} failed")
+                continue
+            baseline = baseline or result
+            row = {'model': model, 'setting': env, 'image_ms': result['image_ms'], 'frame_ms': result['frame_ms'],
+                   'agreement': agreement(model, baseline, result), 'accuracy': accuracy(model, result)}
+            rows.append(row)
+            acc = '-' if row['accuracy'] is None else f"{row['accuracy']:.2f}"
+            print(f"{model:<11} {label:<60} {row['image_ms']:>9.1f} {row['frame_ms']:>9.1f} "
+                  f"{row['agreement']:>6.2f} {acc:>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == '__main__':
+    main()
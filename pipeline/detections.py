@@ -0,0 +1,44 @@
+import numpy as np
+
+min_crop_size = 10
+
+# Compact per-frame detection record shared by the detectors
+detection_dtype = np.dtype([
+    ('box', np.int32, (4,)),     # x1, y1, x2, y2 clipped to the image
+    ('confidence', np.float32),
+    ('class_id', np.int16),
+])
+
+def filter_detections(boxes, conf, cls, class_ids, min_conf, img_shape, min_size=min_crop_size):
+    """
+    Filter raw detector output in one vectorized pass
+
+    Args:
+        boxes: (N, 4) array of x1, y1, x2, y2 pixel coordinates
+        conf: (N,) confidences
+        cls: (N,) class ids
+        class_ids: class ids to keep
+        min_conf: detections must score strictly above this
+        img_shape: shape of the source image, boxes are clipped to it
+        min_size: minimum width and height of the clipped box
+
+    Returns:
+        Structured array of detection_dtype
+    """
+    h, w = img_shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+    cls = np.asarray(cls).reshape(-1).astype(np.int64)
+
+    clipped = np.empty(boxes.shape, dtype=np.int32)
+    clipped[:, 0::2] = np.clip(boxes[:, 0::2], 0, w)
+    clipped[:, 1::2] = np.clip(boxes[:, 1::2], 0, h)
+
+    mask = np.isin(cls, class_ids) & (conf > min_conf)
+    mask &= (clipped[:, 2] - clipped[:, 0] >= min_size) & (clipped[:, 3] - clipped[:, 1] >= min_size)
+
+    detections = np.empty(int(mask.sum()), dtype=detection_dtype)
+    detections['box'] = clipped[mask]
+    detections['confidence'] = conf[mask]
+    detections['class_id'] = cls[mask]
+    return detections
@@ -0,0 +1,37 @@
+import queue
+from contextlib import contextmanager
+
+class DetectorPool:
+    """Fixed set of detector instances handed out to one request thread at a time.
+
+    cv2.dnn nets and torch models keep per-call state (setInput/forward), so an
+    instance must never be used by two threads at once. Requests block until
+    an instance is free instead of racing on a shared one.
+    """
+
+    def __init__(self, factory, size=1):
+        if size < 1:
+            raise ValueError(f"Pool size must be at least 1, got {size}")
+        self.instances = [factory(i) for i in range(size)]
+        self.available = queue.Queue()
+        for instance in self.instances:
+            self.available.put(instance)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        try:
+            instance = self.available.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No detector available")
+        try:
+            yield instance
+        finally:
+            self.available.put(instance)
+
+    def run(self, method, *args):
+        """Call instance.method(*args) on a free instance"""
+        with self.acquire() as instance:
+            return getattr(instance, method)(*args)
+
+    def __len__(self):
+        return len(self.instances)
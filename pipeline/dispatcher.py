@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pipeline.metrics import metrics
+from pipeline.result_cache import frame_hash
+
+class CoalescingDispatcher:
+    """Serves concurrent detection requests from one capture and one inference per model.
+
+    Requests arriving within `window` seconds of the first pending one are
+    collected, a single frame is grabbed, and each requested detector runs
+    once on it. Every request gets the same frame and the shared result.
+    Requests that arrive while inference is running form the next window,
+    which is served on its own thread (up to max_batches at once), so a
+    weapons request doesn't wait behind an unrelated people inference and
+    several detector replicas can be busy at the same time. The batch's capture and inference timings are added to the stage log of
+    every request it served.
+    """
+
+    def __init__(self, grab_frame, detectors, window=0.02, executor=None, cache=None, max_batches=4):
+        """
+        Args:
+            grab_frame: callable returning a camera Frame or None
+            detectors: dict of name -> callable(image) -> result
+            window: seconds to wait for more requests after the first arrives
+            executor: runs different detectors side by side; defaults to one thread per detector
+            cache: optional ResultCache consulted before running a detector
+            max_batches: batches served concurrently
+        """
+        self.grab_frame = grab_frame
+        self.detectors = detectors
+        self.window = window
+        self.cache = cache
+        self.executor = executor or ThreadPoolExecutor(max_workers=max(len(detectors), 1))
+        # Separate from executor, whose threads the batches wait on
+        self.batches = ThreadPoolExecutor(max_workers=max_batches)
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, names):
+        """
+        Queue one request for several detectors on the same frame
+
+        Returns a Future resolving to (frame, {name: result}).
+        """
+        unknown = [name for name in names if name not in self.detectors]
+        if unknown:
+            raise KeyError(f"Unknown detectors: {', '.join(unknown)}")
+        future = Future()
+        with self.cond:
+            self.pending.append((tuple(names), future, metrics.request_stages()))
+            self.cond.notify()
+        return future
+
+    def detect(self, name, timeout=None):
+        """Blocking single-detector request; returns (frame, result)"""
+        frame, results = self.submit([name]).result(timeout)
+        return frame, results[name]
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            if self.window > 0:
+                time.sleep(self.window)
+            with self.cond:
+                batch, self.pending = self.pending, []
+            try:
+                self.batches.submit(self._serve, batch)
+            except Exception as e:
+                self._fail(batch, e)
+
+    def _fail(self, batch, error):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _serve(self, batch):
+        try:
+            self._run_batch(batch)
+        except Exception as e:
+            # Never leave a request waiting on a batch that died part way
+            print(f"Coalesced batch failed: {e}")
+            self._fail(batch, e)
+
+    def _run_batch(self, batch):
+        # Detector threads inherit this context, so their stages land here too
+        shared = metrics.collect_stages()
+        metrics.increment('coalesced_requests_total', len(batch))
+        metrics.increment('coalesced_batches_total')
+
+        try:
+            with metrics.stage('coalesced_capture'):
+                frame = self.grab_frame()
+            if frame is None:
+                raise RuntimeError("Failed to take screenshot")
+        except Exception as e:
+            for _, future, stages in batch:
+                metrics.add_stages(stages, shared)
+            self._fail(batch, e)
+            return
+
+        requested = {name for names, _, _ in batch for name in names}
+        results, errors = {}, {}
+        image_hash = None
+        if self.cache is not None:
+            image_hash = frame_hash(frame.image)
+            for name in requested:
+                cached = self.cache.get(name, frame, image_hash)
+                if cached is not None:
+                    results[name] = cached
+
+        # One inference per requested model that missed the cache, run side by side
+        running = {name: metrics.submit(self.executor, self.detectors[name], frame.image)
+                   for name in requested if name not in results}
+        for name, future in running.items():
+            try:
+                results[name] = future.result()
+                if self.cache is not None:
+                    self.cache.put(name, frame, results[name], image_hash)
+            except Exception as e:
+                errors[name] = e
+
+        for names, future, stages in batch:
+            metrics.add_stages(stages, shared)
+            failed = [errors[name] for name in names if name in errors]
+            if failed:
+                future.set_exception(failed[0])
+            else:
+                future.set_result((frame, {name: results[name] for name in names}))
@@ -0,0 +1,57 @@
+import cv2
+
+FORMATS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+    'png': ('.png', None),
+}
+
+class EncodingPolicy:
+    """How an image is encoded for a response: format, quality and optional downscale"""
+
+    def __init__(self, format='jpeg', quality=85, max_edge=None):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"Quality must be between 1 and 100, got {quality}")
+        if max_edge is not None and max_edge < 16:
+            raise ValueError(f"max_edge must be at least 16, got {max_edge}")
+        self.format = format
+        self.quality = quality
+        self.max_edge = max_edge
+
+    def override(self, args):
+        """
+        Return a copy with 'format', 'quality' and 'max_edge' taken from request args
+
+        Raises ValueError on invalid values.
+        """
+        format = args.get('format', self.format).lower()
+        if format == 'jpg':
+            format = 'jpeg'
+        quality = int(args.get('quality', self.quality))
+        max_edge = args.get('max_edge')
+        max_edge = int(max_edge) if max_edge else self.max_edge
+        return EncodingPolicy(format, quality, max_edge)
+
+    def resize(self, img):
+        if self.max_edge is None:
+            return img
+        h, w = img.shape[:2]
+        long_edge = max(h, w)
+        if long_edge <= self.max_edge:
+            return img
+        scale = self.max_edge / long_edge
+        return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def encode(self, img):
+        ext, quality_flag = FORMATS[self.format]
+        params = [quality_flag, self.quality] if quality_flag is not None else []
+        ok, buf = cv2.imencode(ext, self.resize(img), params)
+        if not ok:
+            raise ValueError(f"Failed to encode image as {self.format}")
+        return buf.tobytes()
+
+    def __repr__(self):
+        return f"EncodingPolicy({self.format}, quality={self.quality}, max_edge={self.max_edge})"
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+from pipeline.model_registry import default_cache_dir, load_tfhub_model, load_yolov5, MOVENET_THUNDER_URL
+from pipeline.onnx_runtime import default_onnx_dir, YOLOV5_ONNX, MOVENET_ONNX, COLLAPSE_ONNX
+
+# The collapse fast path helpers live with the pose detector
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pose-detection'))
+from collapse_mlp import NumpyCollapseModel, default_folded_weights_path
+from scaler_cache import fit_scaler_params, hash_file
+
+# Run from the repo root: python -m pipeline.export_onnx
+default_yolov5_model = 'weapon_detection/yolov5s.pt'
+default_collapse_model = 'pose-detection/collapseModel.h5'
+default_training_data = 'pose-detection/pose_labels.csv'
+
+def _add_metadata(path, metadata):
+    import onnx
+
+    model = onnx.load(path)
+    for key, value in metadata.items():
+        entry = model.metadata_props.add()
+        entry.key = key
+        entry.value = value
+    onnx.save(model, path)
+
+def export_yolov5(model_path, output_path, img_size=640, opset=12):
+    """Export the raw YOLOv5 network (no AutoShape pre/post-processing) with a dynamic batch axis"""
+    import torch
+
+    hub_model = load_yolov5(model_path, default_cache_dir)
+    model = hub_model.model
+    # AutoShape wraps DetectMultiBackend, which wraps the DetectionModel
+    model = getattr(model, 'model', model).float().eval()
+    # Detect then returns only the concatenated (batch, anchors, 5 + classes) predictions
+    model.model[-1].export = True
+
+    dummy = torch.zeros(1, 3, img_size, img_size)
+    torch.onnx.export(model, dummy, output_path, opset_version=opset,
+                      input_names=['images'], output_names=['output'],
+                      dynamic_axes={'images': {0: 'batch'}, 'output': {0: 'batch'}})
+
+    names = hub_model.names
+    names = dict(enumerate(names)) if isinstance(names, (list, tuple)) else names
+    _add_metadata(output_path, {'names': json.dumps(names), 'stride': str(int(model.stride.max()))})
+
+def export_movenet(output_path, opset=13):
+    """Export MoveNet Thunder's serving signature; the input is fixed at (1, 256, 256, 3) int32"""
+    import tensorflow as tf
+    import tf2onnx
+
+    movenet = load_tfhub_model(MOVENET_THUNDER_URL, 'movenet_thunder_4', default_cache_dir)
+    signature = movenet.signatures['serving_default']
+    spec = (tf.TensorSpec((1, 256, 256, 3), tf.int32, name='input'),)
+
+    @tf.function(input_signature=spec)
+    def run(input):
+        return {'output_0': signature(input)['output_0']}
+
+    tf2onnx.convert.from_function(run, input_signature=spec, opset=opset, output_path=output_path)
+
+def export_collapse(model_path, output_path, opset=13):
+    """Export the Keras collapse MLP; it takes scaled (N, 34) keypoint vectors like the .h5 model"""
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(model_path)
+    spec = (tf.TensorSpec((None, model.input_shape[-1]), tf.float32, name='keypoints'),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=output_path)
+
+def export_collapse_folded(model_path, training_data_path, output_path):
+    """Fold the scaler into the collapse MLP for the NumPy fast path, tagged with the training data hash"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    mean, scale = fit_scaler_params(training_data_path)
+    NumpyCollapseModel.from_keras(model, mean, scale).save(output_path, hash_file(training_data_path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the detector models to ONNX for the onnx backends")
+    parser.add_argument('--models', default='yolov5,movenet,collapse')
+    parser.add_argument('--output-dir', default=default_onnx_dir)
+    parser.add_argument('--yolov5', default=default_yolov5_model)
+    parser.add_argument('--collapse', default=default_collapse_model)
+    parser.add_argument('--training-data', default=default_training_data,
+                        help="Collapse training CSV the folded fast path scaler is fitted on")
+    parser.add_argument('--img-size', type=int, default=640, help="YOLOv5 input size")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in args.models.split(','):
+        if name == 'yolov5':
+            path = os.path.join(args.output_dir, YOLOV5_ONNX)
+            export_yolov5(args.yolov5, path, args.img_size)
+        elif name == 'movenet':
+            path = os.path.join(args.output_dir, MOVENET_ONNX)
+            export_movenet(path)
+        elif name == 'collapse':
+            path = os.path.join(args.output_dir, COLLAPSE_ONNX)
+            export_collapse(args.collapse, path)
+            # Also the folded weights for POSE_BACKEND=onnx with --fast-path
+            export_collapse_folded(args.collapse, args.training_data, default_folded_weights_path)
+        else:
+            raise ValueError(f"Unknown model {name}, expected yolov5, movenet or collapse")
+        print(f"[EXPORT] {name} -> {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
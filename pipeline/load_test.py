@@ -0,0 +1,58 @@
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+# Start the server against the synthetic camera first, e.g.
+#   CAMERA_SOURCE=synthetic SERVER_MODE=production SERVER_THREADS=8 python server.py
+# then from the repo root: python -m pipeline.load_test --concurrency 8
+
+def worker(url, deadline, latencies, statuses, lock):
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError) as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+def percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec against the detection server")
+    parser.add_argument('--url', default='http://localhost:8100/screenshot_people')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30.0)
+    args = parser.parse_args()
+
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=worker, args=(args.url, deadline, latencies, statuses, lock))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    print(f"{args.url} with {args.concurrency} clients for {wall:.1f}s")
+    print(f"requests: {len(ordered)}  ({len(ordered) / wall:.2f} req/s)")
+    print(f"latency p50 {percentile(ordered, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(ordered, 0.95) * 1000:.1f} ms, "
+          f"p99 {percentile(ordered, 0.99) * 1000:.1f} ms")
+    print(f"statuses: {dict(statuses)}")
+
+if __name__ == '__main__':
+    main()
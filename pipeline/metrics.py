@@ -0,0 +1,153 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+quantiles = (0.5, 0.95, 0.99)
+# Recent samples kept per stage for the p50/p95/p99 estimates
+reservoir_size = 1024
+
+# Stage timings of the request being served, shared with worker threads via copy_context
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+class StageHistogram:
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=reservoir_size)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class Metrics:
+    """Per-stage latency histograms exposed in Prometheus text format"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[stage] = round(stages.get(stage, 0.0) + seconds, 6)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator recording every call of the wrapped function under stage name"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def start_request(self, endpoint):
+        _request_stages.set({})
+        return time.perf_counter()
+
+    def end_request(self, endpoint, status, started):
+        """Record total request latency and print one JSON log line with the stage split"""
+        elapsed = time.perf_counter() - started
+        stages = _request_stages.get() or {}
+        _request_stages.set(None)
+
+        self.observe(f"request{endpoint.replace('/', '_')}", elapsed)
+        self.increment(f'requests_total{{endpoint="{endpoint}",status="{status}"}}')
+        print(json.dumps({
+            'event': 'request',
+            'endpoint': endpoint,
+            'status': status,
+            'total_seconds': round(elapsed, 6),
+            'stages': stages,
+        }))
+
+    def request_stages(self):
+        """Stage dict of the current request, or None outside one; lets another thread add to it"""
+        return _request_stages.get()
+
+    def collect_stages(self):
+        """Record stages observed from here on in this context into a new dict, and return it"""
+        stages = {}
+        _request_stages.set(stages)
+        return stages
+
+    def add_stages(self, stages, shared):
+        """Add stage timings recorded elsewhere, e.g. for a coalesced batch, to a request's stages"""
+        if stages is None:
+            return
+        for stage, seconds in shared.items():
+            stages[stage] = round(stages.get(stage, 0.0) + seconds, 6)
+
+    def submit(self, pool, fn, *args):
+        """Submit to a thread pool so stage timings still count towards the current request"""
+        context = contextvars.copy_context()
+        return pool.submit(context.run, fn, *args)
+
+    def render_prometheus(self):
+        lines = [
+            '# HELP stage_latency_seconds Latency of each pipeline stage.',
+            '# TYPE stage_latency_seconds histogram',
+        ]
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            for stage, histogram in histograms:
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'stage_latency_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f'# HELP stage_latency_recent_seconds Latency quantiles over the last {reservoir_size} calls.')
+            lines.append('# TYPE stage_latency_recent_seconds gauge')
+            for stage, histogram in histograms:
+                for q in quantiles:
+                    lines.append(f'stage_latency_recent_seconds{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+
+            typed = set()
+            for name, value in counters:
+                metric = name.split('{', 1)[0]
+                if metric not in typed:
+                    lines.append(f'# TYPE pipeline_{metric} counter')
+                    typed.add(metric)
+                lines.append(f'pipeline_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
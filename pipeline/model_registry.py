@@ -0,0 +1,158 @@
+import os
+import resource
+import sys
+import threading
+import time
+
+# Models are resolved from here first so edge nodes can run without network access
+default_cache_dir = os.environ.get("MODEL_CACHE_DIR", "models")
+
+MOVENET_THUNDER_URL = "https://tfhub.dev/google/movenet/singlepose/thunder/4"
+BLIP_CAPTION_MODEL = "Salesforce/blip-image-captioning-base"
+CLIP_MODEL = "openai/clip-vit-base-patch32"
+
+def _rss_bytes():
+    """
+    Resident set size in bytes and which one it is
+
+    Returns:
+        tuple: (bytes, 'current_rss'), or (bytes, 'peak_rss') where /proc is unavailable
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'), 'current_rss'
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and KiB elsewhere
+        return (peak if sys.platform == 'darwin' else peak * 1024), 'peak_rss'
+
+class ModelRegistry:
+    """Lazily loads named models once, warms them up off the request path and
+    records how long each took and how much memory it added."""
+
+    def __init__(self, cache_dir=default_cache_dir):
+        self.cache_dir = cache_dir
+        self.specs = {}
+        self.models = {}
+        self.stats = {}
+        # Loads are serialized so per-model memory deltas are meaningful
+        self.load_lock = threading.Lock()
+
+    def register(self, name, loader, warmup=None):
+        """
+        Register a model without loading it
+
+        Args:
+            name: registry key
+            loader: callable(cache_dir) -> model
+            warmup: optional callable(model) running one dummy inference
+        """
+        if name not in self.specs:
+            self.specs[name] = (loader, warmup)
+
+    def get(self, name):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+
+        with self.load_lock:
+            if name in self.models:
+                return self.models[name]
+            if name not in self.specs:
+                raise KeyError(f"Unknown model: {name}")
+
+            loader, warmup = self.specs[name]
+            os.makedirs(self.cache_dir, exist_ok=True)
+            print(f"[MODELS] Loading {name}...")
+            rss_before, _ = _rss_bytes()
+            start = time.perf_counter()
+            model = loader(self.cache_dir)
+            load_seconds = time.perf_counter() - start
+
+            warmup_seconds = None
+            if warmup is not None:
+                start = time.perf_counter()
+                warmup(model)
+                warmup_seconds = time.perf_counter() - start
+
+            rss_after, measure = _rss_bytes()
+            self.stats[name] = {
+                'load_seconds': round(load_seconds, 3),
+                'warmup_seconds': round(warmup_seconds, 3) if warmup_seconds is not None else None,
+                'memory_mb': round((rss_after - rss_before) / (1024 * 1024), 1),
+                # With peak_rss the delta is only the growth of the peak, not what the model holds
+                'memory_measure': measure,
+            }
+            self.models[name] = model
+            print(f"[MODELS] Loaded {name}: {self.stats[name]}")
+            return model
+
+    def warmup_async(self, names=None):
+        """Load and warm up models on a background thread; returns the thread"""
+        names = list(self.specs) if names is None else list(names)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[MODELS] Failed to load {name}: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def report(self):
+        return {name: dict(self.stats.get(name, {}), loaded=name in self.models)
+                for name in self.specs}
+
+registry = ModelRegistry()
+
+def load_tfhub_model(url, local_name, cache_dir):
+    """Load a TF Hub model from cache_dir/local_name, downloading it into the cache otherwise"""
+    import tensorflow_hub as hub
+
+    local_path = os.path.join(cache_dir, local_name)
+    if os.path.exists(os.path.join(local_path, 'saved_model.pb')):
+        return hub.load(local_path)
+    # tensorflow_hub keeps its download under TFHUB_CACHE_DIR for next time
+    os.environ.setdefault('TFHUB_CACHE_DIR', os.path.join(cache_dir, 'tfhub'))
+    return hub.load(url)
+
+def load_yolov5(model_path, cache_dir):
+    """Load custom YOLOv5 weights, from a local clone of the ultralytics repo when present"""
+    import torch
+
+    local_repo = os.path.join(cache_dir, 'yolov5')
+    if os.path.isdir(local_repo):
+        return torch.hub.load(local_repo, 'custom', path=model_path, source='local')
+    torch.hub.set_dir(os.path.join(cache_dir, 'torch_hub'))
+    return torch.hub.load('ultralytics/yolov5', 'custom', path=model_path, force_reload=False)
+
+def load_blip_caption(cache_dir, model_name=BLIP_CAPTION_MODEL):
+    """Load the BLIP captioning processor and model, preferring local files"""
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+    hf_cache = os.path.join(cache_dir, 'huggingface')
+    try:
+        processor = BlipProcessor.from_pretrained(model_name, cache_dir=hf_cache, local_files_only=True)
+        model = BlipForConditionalGeneration.from_pretrained(model_name, cache_dir=hf_cache, local_files_only=True)
+    except OSError:
+        print(f"[MODELS] {model_name} not in {hf_cache}, downloading...")
+        processor = BlipProcessor.from_pretrained(model_name, cache_dir=hf_cache)
+        model = BlipForConditionalGeneration.from_pretrained(model_name, cache_dir=hf_cache)
+    return processor, model
+
+def load_clip(cache_dir, model_name=CLIP_MODEL):
+    """Load a CLIP processor and model for zero-shot scoring, preferring local files"""
+    from transformers import CLIPProcessor, CLIPModel
+
+    hf_cache = os.path.join(cache_dir, 'huggingface')
+    try:
+        processor = CLIPProcessor.from_pretrained(model_name, cache_dir=hf_cache, local_files_only=True)
+        model = CLIPModel.from_pretrained(model_name, cache_dir=hf_cache, local_files_only=True)
+    except OSError:
+        print(f"[MODELS] {model_name} not in {hf_cache}, downloading...")
+        processor = CLIPProcessor.from_pretrained(model_name, cache_dir=hf_cache)
+        model = CLIPModel.from_pretrained(model_name, cache_dir=hf_cache)
+    return processor, model
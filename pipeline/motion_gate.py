@@ -0,0 +1,100 @@
+import threading
+import time
+import cv2
+import numpy as np
+from pipeline.metrics import metrics
+
+class MotionGate:
+    """Skips a detector on frames where the scene hasn't changed.
+
+    Each frame is downscaled, converted to gray and blurred, then compared
+    with the frame the detector last ran on. The detector runs only when the
+    fraction of changed pixels inside the ROI exceeds `threshold`, or when
+    `keepalive` seconds have passed since the last run. Otherwise the previous
+    result is returned.
+    """
+
+    def __init__(self, name='gate', threshold=0.01, pixel_threshold=25, roi=None,
+                 width=160, keepalive=5.0):
+        """
+        Args:
+            name: label used in metrics
+            threshold: fraction of ROI pixels that must change to run
+            pixel_threshold: per-pixel gray-level difference counted as a change
+            roi: (x1, y1, x2, y2) as fractions of the frame, or None for the whole frame
+            width: width the frame is downscaled to before differencing
+            keepalive: run at least this often in seconds, even on a static scene
+        """
+        self.name = name
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.roi = roi
+        self.width = width
+        self.keepalive = keepalive
+        self.reference = None
+        self.last_run = 0.0
+        self.last_result = None
+        self.frames = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def _prepare(self, image):
+        h, w = image.shape[:2]
+        if self.roi is not None:
+            x1, y1, x2, y2 = self.roi
+            image = image[int(y1 * h):int(y2 * h), int(x1 * w):int(x2 * w)]
+            h, w = image.shape[:2]
+        small = cv2.resize(image, (self.width, max(1, round(h * self.width / w))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed(self, image):
+        """Fraction of ROI pixels that differ from the reference frame (1.0 if there is none)"""
+        prepared = self._prepare(image)
+        if self.reference is None or self.reference.shape != prepared.shape:
+            return 1.0, prepared
+        diff = cv2.absdiff(prepared, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size, prepared
+
+    def gate(self, image, compute, now=None):
+        """
+        Run compute(image) if the scene changed, else return the previous result
+
+        Returns:
+            tuple: (result, ran)
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self.frames += 1
+            metrics.increment(f'motion_gate_frames_total{{gate="{self.name}"}}')
+            fraction, prepared = self.changed(image)
+            if fraction <= self.threshold and now - self.last_run < self.keepalive:
+                self.skipped += 1
+                metrics.increment(f'motion_gate_skipped_total{{gate="{self.name}"}}')
+                return self.last_result, False
+
+            self.last_result = compute(image)
+            self.reference = prepared
+            self.last_run = now
+            return self.last_result, True
+
+    def wrap(self, compute):
+        """Gated version of compute(image) -> result"""
+        def gated(image):
+            return self.gate(image, compute)[0]
+        return gated
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+def parse_roi(spec):
+    """Parse "x1,y1,x2,y2" fractions into a tuple, or None for an empty spec"""
+    if not spec:
+        return None
+    roi = tuple(float(v) for v in spec.split(','))
+    if len(roi) != 4:
+        raise ValueError(f"ROI needs 4 values, got {spec}")
+    return roi
@@ -0,0 +1,112 @@
+import json
+import os
+import cv2
+import numpy as np
+from pipeline.model_registry import default_cache_dir
+from pipeline.runtime import intra_op_threads, inter_op_threads
+
+# python -m pipeline.export_onnx writes here
+default_onnx_dir = os.path.join(default_cache_dir, 'onnx')
+YOLOV5_ONNX = 'yolov5s.onnx'
+MOVENET_ONNX = 'movenet_thunder.onnx'
+COLLAPSE_ONNX = 'collapse_model.onnx'
+
+class OnnxModel:
+    """ONNX Runtime session on the CPU provider, honoring the process thread budget"""
+
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ONNX model not found: {path} (run python -m pipeline.export_onnx)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input = self.session.get_inputs()[0]
+        self.metadata = self.session.get_modelmeta().custom_metadata_map
+
+    @property
+    def fixed_batch(self):
+        # Static batch dimension, or None when the export has a dynamic batch axis
+        batch = self.input.shape[0]
+        return batch if isinstance(batch, int) else None
+
+    def run(self, array):
+        """Run on one input array and return the first output"""
+        if self.fixed_batch == 1 and len(array) > 1:
+            return np.concatenate([self.run(array[i:i + 1]) for i in range(len(array))])
+        return self.session.run(None, {self.input.name: array})[0]
+
+def letterbox(img, size, color=114):
+    """Resize keeping aspect ratio and pad to size x size; returns (image, scale, (pad_x, pad_y))"""
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out = np.full((size, size, 3), color, dtype=np.uint8)
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return out, scale, (pad_x, pad_y)
+
+def yolo_nms(pred, conf_threshold=0.25, iou_threshold=0.45, max_det=1000):
+    """
+    Per-class NMS on one raw YOLOv5 output of shape (anchors, 5 + classes)
+
+    Returns rows of [x1, y1, x2, y2, conf, class] like results.xyxy from the hub model.
+    """
+    pred = pred[pred[:, 4] > conf_threshold]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+    scores = pred[:, 5:] * pred[:, 4:5]
+    class_ids = scores.argmax(axis=1)
+    conf = scores[np.arange(len(pred)), class_ids]
+    keep = conf > conf_threshold
+    pred, class_ids, conf = pred[keep], class_ids[keep], conf[keep]
+
+    xywh = pred[:, :4]
+    boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    offset = class_ids[:, None] * 7680.0
+    nms_boxes = [[float(x1), float(y1), float(x2 - x1), float(y2 - y1)]
+                 for x1, y1, x2, y2 in boxes + offset]
+    indices = cv2.dnn.NMSBoxes(nms_boxes, conf.tolist(), conf_threshold, iou_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+    return np.concatenate([boxes[indices], conf[indices, None], class_ids[indices, None]], axis=1).astype(np.float32)
+
+class OnnxYoloV5:
+    """YOLOv5 exported by pipeline.export_onnx, with the hub model's letterbox and NMS.
+
+    The export has a fixed square input, where the hub model letterboxes to
+    the smallest stride-aligned rectangle, so boxes can differ by a pixel or
+    two. Called with a list of BGR images, returns one [x1, y1, x2, y2, conf, class]
+    array per image in original pixel coordinates. Class names come from the
+    ONNX metadata.
+    """
+
+    def __init__(self, path, conf=0.25, iou=0.45):
+        self.model = OnnxModel(path)
+        self.names = {int(k): v for k, v in json.loads(self.model.metadata['names']).items()}
+        self.size = int(self.model.input.shape[2])
+        self.conf = conf
+        self.iou = iou
+
+    def __call__(self, imgs):
+        batch, geometry = [], []
+        for img in imgs:
+            # Channels are passed through as given, like WeaponDetector does with the hub model
+            padded, scale, pad = letterbox(img, self.size)
+            batch.append(padded)
+            geometry.append((scale, pad))
+        inputs = np.ascontiguousarray(np.stack(batch).transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        results = []
+        for pred, (scale, (pad_x, pad_y)) in zip(self.model.run(inputs), geometry):
+            detections = yolo_nms(pred, self.conf, self.iou)
+            detections[:, [0, 2]] = (detections[:, [0, 2]] - pad_x) / scale
+            detections[:, [1, 3]] = (detections[:, [1, 3]] - pad_y) / scale
+            results.append(detections)
+        return results
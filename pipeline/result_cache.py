@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from pipeline.metrics import metrics
+
+def frame_hash(image):
+    """64-bit difference hash; nearly identical frames hash to the same value"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def parse_ttls(spec):
+    """Parse "people=0.5,weapons=1" into {'people': 0.5, 'weapons': 1.0}"""
+    ttls = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, seconds = item.split('=', 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+class ResultCache:
+    """Detection results keyed by detector and frame, with per-detector TTL and LRU eviction.
+
+    Lookups match the exact capture sequence number first, then the frame's
+    perceptual hash, so a static scene reuses results across captures.
+    Memory is bounded by max_bytes, counting the frame each result's crops
+    point into.
+    """
+
+    def __init__(self, ttls=None, default_ttl=0.5, max_bytes=64 * 1024 * 1024):
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (detector, hash) -> (seq, stored_at, result, size)
+        self.by_seq = {}              # (detector, seq) -> (detector, hash)
+        self.total_bytes = 0
+        self.hits = {}
+        self.misses = {}
+        self.lock = threading.Lock()
+
+    def ttl(self, detector):
+        return self.ttls.get(detector, self.default_ttl)
+
+    def get(self, detector, frame, image_hash=None):
+        """Return the cached result for detector on frame, or None"""
+        if self.ttl(detector) <= 0:
+            return None
+        with self.lock:
+            key = self.by_seq.get((detector, frame.seq))
+            if key is None:
+                if image_hash is None:
+                    image_hash = frame_hash(frame.image)
+                key = (detector, image_hash)
+
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl(detector):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self._count(self.misses, 'result_cache_misses_total', detector)
+                return None
+            self.entries.move_to_end(key)
+            self._count(self.hits, 'result_cache_hits_total', detector)
+            return entry[2]
+
+    def put(self, detector, frame, result, image_hash=None):
+        if self.ttl(detector) <= 0:
+            return
+        if image_hash is None:
+            image_hash = frame_hash(frame.image)
+        size = frame.image.nbytes + 1024
+        if size > self.max_bytes:
+            return
+
+        key = (detector, image_hash)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (frame.seq, time.time(), result, size)
+            self.by_seq[(detector, frame.seq)] = key
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        seq, _, _, size = self.entries.pop(key)
+        self.by_seq.pop((key[0], seq), None)
+        self.total_bytes -= size
+
+    def _count(self, counts, metric, detector):
+        counts[detector] = counts.get(detector, 0) + 1
+        metrics.increment(f'{metric}{{detector="{detector}"}}')
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'hits': dict(self.hits),
+                'misses': dict(self.misses),
+            }
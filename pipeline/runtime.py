@@ -0,0 +1,70 @@
+import os
+
+# Thread budgets per framework; unset leaves the framework default. When several
+# models run side by side, keep intra-op threads x concurrent models <= cores.
+intra_op_threads = int(os.environ.get("INTRA_OP_THREADS", "0")) or None
+inter_op_threads = int(os.environ.get("INTER_OP_THREADS", "0")) or None
+# cv2.setNumThreads; 0 runs OpenCV single-threaded
+opencv_threads = os.environ.get("OPENCV_THREADS")
+
+_configured = set()
+
+def configure_torch(intra_op=None, inter_op=None):
+    """Apply torch thread settings once per process"""
+    if 'torch' in _configured:
+        return
+    import torch
+
+    intra_op = intra_op or intra_op_threads
+    inter_op = inter_op or inter_op_threads
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError as e:
+            # Only allowed before the first parallel op in the process
+            print(f"[RUNTIME] Could not set torch inter-op threads: {e}")
+    _configured.add('torch')
+
+def configure_tensorflow(intra_op=None, inter_op=None):
+    """Apply TensorFlow thread settings once per process, before the first op runs"""
+    if 'tensorflow' in _configured:
+        return
+    import tensorflow as tf
+
+    intra_op = intra_op or intra_op_threads
+    inter_op = inter_op or inter_op_threads
+    try:
+        if intra_op:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra_op))
+        if inter_op:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter_op))
+    except RuntimeError as e:
+        print(f"[RUNTIME] Could not set TensorFlow threads: {e}")
+    _configured.add('tensorflow')
+
+def configure_opencv(threads=None):
+    """Apply cv2.setNumThreads once per process"""
+    if 'opencv' in _configured:
+        return
+    import cv2
+
+    threads = threads if threads is not None else opencv_threads
+    if threads is not None:
+        cv2.setNumThreads(int(threads))
+    _configured.add('opencv')
+
+def quantize_linear_int8(model):
+    """
+    Dynamic INT8 quantization of a torch model's nn.Linear layers for CPU inference
+
+    Weights are stored as int8 and activations are quantized per call, so no
+    calibration data is needed. Other layer types are left in float.
+    """
+    import torch
+
+    linear_layers = sum(isinstance(m, torch.nn.Linear) for m in model.modules())
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    print(f"[RUNTIME] Quantized {linear_layers} linear layers of {type(model).__name__} to INT8")
+    return quantized
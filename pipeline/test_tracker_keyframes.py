@@ -0,0 +1,58 @@
+import numpy as np
+from pipeline.detections import detection_dtype
+from pipeline.tracker import Tracker
+
+# Run from the repo root: python -m pipeline.test_tracker_keyframes
+frames = 50
+keyframe_interval = 5
+
+def walking(frame):
+    # Walking right at 2 px per frame
+    return 100 + 2 * frame
+
+def speeding_up(frame):
+    # Breaks into a run at 8 px per frame from frame 20
+    return walking(frame) if frame < 20 else walking(20) + 8 * (frame - 20)
+
+def person(x, confidence):
+    out = np.empty(1, dtype=detection_dtype)
+    out[0] = ((x, 50, x + 80, 250), confidence, 0)
+    return out
+
+def run(detect, **kwargs):
+    tracker = Tracker(keyframe_interval=keyframe_interval, **kwargs)
+    keyframes = []
+    for frame in range(frames):
+        _, ran = tracker.step(frame, detect)
+        if ran:
+            keyframes.append(frame)
+    return tracker, keyframes
+
+scheduled = list(range(0, frames, keyframe_interval))
+
+# A steady track runs the detector on the schedule only, whatever its absolute confidence;
+# PeopleCropper keeps people down to 0.1, so weak detections must not force extra keyframes
+for confidence in (0.8, 0.3, 0.15):
+    tracker, keyframes = run(lambda frame: person(walking(frame), confidence))
+    assert keyframes == scheduled, (confidence, keyframes)
+    assert len(tracker.confirmed()) == 1
+    print(f"Steady track at {confidence}: {tracker.detector_runs}/{frames} detector runs")
+
+# A sudden change of speed leaves the prediction behind on the frame 25 keyframe,
+# so the detector rechecks two frames later and the schedule then resumes
+tracker, keyframes = run(lambda frame: person(speeding_up(frame), 0.8))
+assert keyframes == sorted(scheduled + [27]), keyframes
+assert len(tracker.confirmed()) == 1
+print(f"Speeding up: {tracker.detector_runs}/{frames} detector runs, recheck at frame 27")
+
+# A detector confidence that drops from 0.8 to 0.3 at frame 20 (occlusion) gets one recheck
+tracker, keyframes = run(lambda frame: person(walking(frame), 0.8 if frame < 20 else 0.3))
+assert keyframes == sorted(scheduled + [22]), keyframes
+print(f"Confidence drop: {tracker.detector_runs}/{frames} detector runs, recheck at frame 22")
+
+# A person who leaves after 10 frames: missed tracks wait for the scheduled keyframes and are dropped
+empty = np.empty(0, dtype=detection_dtype)
+tracker, keyframes = run(lambda frame: person(walking(frame), 0.6) if frame < 10 else empty, max_misses=3)
+assert keyframes == scheduled, keyframes
+assert tracker.tracks == [], tracker.tracks
+print(f"Lost track: {tracker.detector_runs}/{frames} detector runs, track dropped")
@@ -0,0 +1,168 @@
+import itertools
+import numpy as np
+from pipeline.detections import detection_dtype
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) x1, y1, x2, y2 boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(1, -1, 4)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+class Track:
+    """One tracked object with a constant-velocity box estimate and per-track state"""
+
+    def __init__(self, track_id, box, confidence, class_id):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        # Last measured box and the frames predicted since, for the velocity estimate
+        self.measured_box = self.box
+        self.since_update = 0
+        self.confidence = float(confidence)
+        # Detector confidence at the last match, and how the last match went: the
+        # IoU of the predicted box with the detection and the change in confidence
+        self.detected_confidence = self.confidence
+        self.match_iou = 1.0
+        self.confidence_ratio = 1.0
+        self.class_id = int(class_id)
+        self.hits = 1
+        self.misses = 0
+        # Smoothed per-track values, e.g. 'collapse_score'
+        self.state = {}
+
+    def predict(self):
+        self.box = self.box + self.velocity
+        self.since_update += 1
+
+    def correct(self, box, confidence, match_iou=1.0, beta=0.5):
+        # Alpha-beta filter: snap to the measurement, smooth the per-frame velocity
+        # measured since the previous detection, which may be several frames back
+        box = np.asarray(box, dtype=np.float32)
+        measured = (box - self.measured_box) / max(self.since_update, 1)
+        self.velocity = beta * measured + (1 - beta) * self.velocity
+        self.box = self.measured_box = box
+        self.since_update = 0
+        self.confidence = float(confidence)
+        self.confidence_ratio = self.confidence / max(self.detected_confidence, 1e-6)
+        self.detected_confidence = self.confidence
+        self.match_iou = float(match_iou)
+        self.hits += 1
+        self.misses = 0
+
+    def smooth(self, key, value, alpha=0.3):
+        """Exponential moving average of value stored under key; returns the new average"""
+        previous = self.state.get(key)
+        self.state[key] = value if previous is None else alpha * value + (1 - alpha) * previous
+        return self.state[key]
+
+    def int_box(self, shape=None):
+        x1, y1, x2, y2 = np.round(self.box).astype(int)
+        if shape is not None:
+            h, w = shape[:2]
+            x1, x2 = np.clip([x1, x2], 0, w)
+            y1, y2 = np.clip([y1, y2], 0, h)
+        return int(x1), int(y1), int(x2), int(y2)
+
+class Tracker:
+    """IoU tracker that lets the heavy detector run on keyframes only.
+
+    Call step(image, detect) once per frame, where detect(image) returns a
+    structured detection_dtype array (e.g. PeopleCropper.detect_boxes). The
+    detector runs every keyframe_interval frames; in between, boxes are
+    propagated with each track's velocity and report a confidence decayed by
+    confidence_decay per frame. A track whose last match went badly, with the
+    predicted box overlapping the detection by less than min_match_iou (it
+    turned or sped up) or the detector confidence falling below
+    min_confidence_ratio of the previous detection (it is being occluded),
+    gets another keyframe recheck_interval frames later instead. Both signals
+    are relative, so weak but steady detections don't force extra keyframes.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=10, keyframe_interval=5,
+                 min_match_iou=0.5, min_confidence_ratio=0.5, recheck_interval=2,
+                 confidence_decay=0.9, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.keyframe_interval = keyframe_interval
+        self.min_match_iou = min_match_iou
+        self.min_confidence_ratio = min_confidence_ratio
+        self.recheck_interval = recheck_interval
+        self.confidence_decay = confidence_decay
+        self.min_hits = min_hits
+        self.tracks = []
+        self.frame_count = 0
+        self.last_keyframe = 0
+        self.detector_runs = 0
+        self.ids = itertools.count(1)
+
+    def needs_keyframe(self):
+        if self.frame_count % self.keyframe_interval == 0:
+            return True
+        if self.frame_count - self.last_keyframe < self.recheck_interval:
+            return False
+        # Tracks already missed on a keyframe wait for the next scheduled one
+        return any(track.match_iou < self.min_match_iou or track.confidence_ratio < self.min_confidence_ratio
+                   for track in self.tracks if track.misses == 0)
+
+    def update(self, detections):
+        """Match a detection_dtype array to the tracks by greedy IoU"""
+        boxes = detections['box'].astype(np.float32)
+        unmatched_dets = set(range(len(detections)))
+        unmatched_tracks = set(range(len(self.tracks)))
+
+        if len(self.tracks) and len(detections):
+            ious = iou_matrix([t.box for t in self.tracks], boxes)
+            for flat in np.argsort(-ious, axis=None):
+                ti, di = np.unravel_index(flat, ious.shape)
+                if ious[ti, di] < self.iou_threshold:
+                    break
+                if ti in unmatched_tracks and di in unmatched_dets:
+                    self.tracks[ti].correct(boxes[di], detections['confidence'][di], ious[ti, di])
+                    unmatched_tracks.discard(ti)
+                    unmatched_dets.discard(di)
+
+        for ti in unmatched_tracks:
+            self.tracks[ti].misses += 1
+        for di in sorted(unmatched_dets):
+            self.tracks.append(Track(next(self.ids), boxes[di], detections['confidence'][di],
+                                     detections['class_id'][di]))
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+    def step(self, image, detect):
+        """
+        Advance one frame, running detect(image) only on keyframes
+
+        Returns:
+            tuple: (confirmed tracks, whether the detector ran)
+        """
+        for track in self.tracks:
+            track.predict()
+
+        ran = self.needs_keyframe()
+        if ran:
+            self.update(detect(image))
+            self.detector_runs += 1
+            self.last_keyframe = self.frame_count
+        else:
+            for track in self.tracks:
+                track.confidence *= self.confidence_decay
+
+        self.frame_count += 1
+        return self.confirmed(), ran
+
+    def confirmed(self):
+        # Tracks seen on at least min_hits keyframes; debounces one-off detections
+        return [t for t in self.tracks if t.hits >= self.min_hits and t.misses == 0]
+
+    def detections(self, shape=None):
+        """Confirmed tracks as a detection_dtype array, plus their ids"""
+        tracks = self.confirmed()
+        out = np.empty(len(tracks), dtype=detection_dtype)
+        for i, track in enumerate(tracks):
+            out[i] = (track.int_box(shape), track.confidence, track.class_id)
+        return out, [t.id for t in tracks]
@@ -1,41 +1,104 @@
-import tensorflow as tf
-import tensorflow_hub as hub
 import cv2
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
+import argparse
+import contextlib
+import json
 import os
+import sys
 import time
+from functools import partial
+from collapse_mlp import NumpyCollapseModel, default_folded_weights_path
+from scaler_cache import load_scaler, hash_file, default_scaler_path
+from collapse_scorer import ScorerBank, STATE_COLORS
+
+# Shared pipeline modules live at the repo root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline.model_registry import registry, load_tfhub_model, MOVENET_THUNDER_URL
+from pipeline.metrics import metrics
+from pipeline.runtime import configure_tensorflow
+from pipeline.onnx_runtime import OnnxModel, default_onnx_dir, MOVENET_ONNX, COLLAPSE_ONNX
+
+MOVENET_INPUT_SIZE = 256
+
+# POSE_BACKEND=onnx runs MoveNet and the collapse model exported by
+# pipeline.export_onnx on ONNX Runtime; TensorFlow is then never imported
+default_backend = os.environ.get("POSE_BACKEND", "tensorflow")
 
 class CollapseDetector:
     """Class for real-time pose-based collapse detection"""
     
     def __init__(self, model_path='pose-detection/collapseModel.h5', 
-                 training_data_path='pose-detection/pose_labels.csv'):
+                 training_data_path='pose-detection/pose_labels.csv',
+                 fast_path=False, scaler_path=default_scaler_path,
+                 backend=default_backend, onnx_dir=default_onnx_dir):
         """
         Initialize the collapse detector
         
         Args:
             model_path: Path to the trained collapse model
             training_data_path: Path to training data for scaler fitting
+            fast_path: Score with a NumPy forward pass that has the scaler
+                folded into the first layer instead of Keras predict
+                (with the onnx backend, loaded from the pipeline.export_onnx
+                or export_fast_weights output, else the ONNX model is used)
+            scaler_path: Cached scaler parameters, refitted when the
+                training data hash changes
+            backend: 'tensorflow' or 'onnx'
+            onnx_dir: Directory with the pipeline.export_onnx models
         """
         print("Initializing CollapseDetector...")
+        if backend not in ('tensorflow', 'onnx'):
+            raise ValueError(f"Unknown pose backend {backend}, expected tensorflow or onnx")
+        self.backend = backend
         
-        # Load MoveNet model
-        print("Loading MoveNet model...")
-        self.model = hub.load("https://tfhub.dev/google/movenet/singlepose/thunder/4")
-        self.movenet = self.model.signatures['serving_default']
+        # MoveNet is resolved from the local model cache and loaded on first use
+        if backend == 'onnx':
+            self.movenet_name = 'movenet_thunder_onnx'
+            registry.register(self.movenet_name,
+                              lambda cache_dir: OnnxModel(os.path.join(onnx_dir, MOVENET_ONNX)),
+                              warmup=self._warmup_movenet)
+        else:
+            # Thread settings only take effect before TensorFlow runs its first op
+            configure_tensorflow()
+            self.movenet_name = 'movenet_thunder'
+            registry.register(self.movenet_name,
+                              partial(load_tfhub_model, MOVENET_THUNDER_URL, 'movenet_thunder_4'),
+                              warmup=self._warmup_movenet)
         
         # Load the trained collapse model
         print("Loading collapse model...")
-        self.collapse_model = tf.keras.models.load_model(model_path)
+        self.collapse_model = None
+        self.collapse_onnx = None
+        if backend == 'onnx':
+            if not fast_path:
+                self.collapse_onnx = OnnxModel(os.path.join(onnx_dir, COLLAPSE_ONNX))
+        else:
+            import tensorflow as tf
+            self.collapse_model = tf.keras.models.load_model(model_path)
+        
+        # Load cached scaler parameters (refit only if the training data changed)
+        print("Loading scaler...")
+        self.scaler = load_scaler(training_data_path, scaler_path)
+        self.training_data_hash = hash_file(training_data_path)
         
-        # Load training data and fit scaler
-        print("Loading training data for scaler...")
-        df = pd.read_csv(training_data_path)
-        X = df.drop("label", axis=1).values
-        self.scaler = StandardScaler()
-        self.scaler.fit(X)
+        # Keras predict has milliseconds of per-call overhead for this tiny MLP
+        self.fast_model = None
+        if fast_path and backend == 'onnx':
+            print("Loading folded collapse model for NumPy fast path...")
+            try:
+                self.fast_model = NumpyCollapseModel.from_npz(default_folded_weights_path,
+                                                              self.training_data_hash)
+            except (OSError, ValueError) as e:
+                print(f"Folded collapse weights unavailable ({e}); using {COLLAPSE_ONNX} instead. "
+                      f"Run python -m pipeline.export_onnx --models collapse to create them.")
+                self.collapse_onnx = OnnxModel(os.path.join(onnx_dir, COLLAPSE_ONNX))
+        elif fast_path:
+            print("Folding scaler into collapse model for NumPy fast path...")
+            self.fast_model = NumpyCollapseModel.from_keras(
+                self.collapse_model, self.scaler.mean_, self.scaler.scale_)
+        
+        # Rolling-window collapse state per person, keyed by track id
+        self.scorers = ScorerBank()
         
         # Define skeleton connections
         self.SKELETON = [
@@ -48,6 +111,47 @@ class CollapseDetector:
         
         print("CollapseDetector initialized successfully!")
     
+    @property
+    def model(self):
+        return registry.get(self.movenet_name)
+    
+    @property
+    def movenet(self):
+        if self.backend == 'onnx':
+            return self.model
+        return self.model.signatures['serving_default']
+    
+    @staticmethod
+    def _warmup_movenet(model):
+        dummy = np.zeros((1, MOVENET_INPUT_SIZE, MOVENET_INPUT_SIZE, 3), dtype=np.int32)
+        if isinstance(model, OnnxModel):
+            model.run(dummy)
+        else:
+            import tensorflow as tf
+            model.signatures['serving_default'](tf.constant(dummy))
+    
+    def _movenet_keypoints(self, input_images):
+        """
+        Run MoveNet on a (N, 256, 256, 3) batch of padded RGB images
+        
+        Returns:
+            keypoints: Array of shape (N, 17, 2) with normalized (y, x) coordinates
+        """
+        input_images = np.asarray(input_images, dtype=np.int32)
+        if self.backend == 'onnx':
+            # OnnxModel splits the batch itself when the export is fixed at batch size 1
+            return self.movenet.run(input_images)[:, 0, :, :2]
+        
+        import tensorflow as tf
+        try:
+            return self.movenet(tf.constant(input_images))['output_0'].numpy()[:, 0, :, :2]
+        except (tf.errors.InvalidArgumentError, ValueError):
+            # Some MoveNet exports are fixed at batch size 1
+            return np.concatenate([
+                self.movenet(tf.constant(input_images[i:i + 1]))['output_0'].numpy()[:, 0, :, :2]
+                for i in range(len(input_images))
+            ])
+    
     def detect_pose(self, frame):
         """
         Detect pose keypoints using MoveNet
@@ -58,10 +162,12 @@ class CollapseDetector:
         Returns:
             keypoints: Array of shape (17, 2) with normalized coordinates
         """
-        input_image = tf.image.resize_with_pad(tf.expand_dims(frame, axis=0), 256, 256)
-        input_image = tf.cast(input_image, dtype=tf.int32)
-        outputs = self.movenet(input_image)
-        keypoints = outputs['output_0'].numpy()[0, 0, :, :2]  # shape: (17, 2)
+        if self.backend == 'onnx':
+            input_image = self._pad_crop(frame)[0][None]
+        else:
+            import tensorflow as tf
+            input_image = tf.image.resize_with_pad(tf.expand_dims(frame, axis=0), MOVENET_INPUT_SIZE, MOVENET_INPUT_SIZE)
+        keypoints = self._movenet_keypoints(input_image)[0]  # shape: (17, 2)
         return keypoints
     
     def preprocess_keypoints(self, keypoints):
@@ -87,13 +193,135 @@ class CollapseDetector:
             collapse_score: Float between 0 and 1 indicating collapse risk
         """
         # Preprocess keypoints
-        input_vec = self.preprocess_keypoints(keypoints).reshape(1, -1)
-        input_vec = self.scaler.transform(input_vec)
+        input_vec = self.preprocess_keypoints(keypoints).reshape(1, 17, 2)
         
         # Predict collapse score
-        collapse_score = self.collapse_model.predict(input_vec, verbose=0)[0][0]
+        collapse_score = self.predict_collapse_batch(input_vec)[0]
         return collapse_score
     
+    def predict_collapse_batch(self, keypoints_batch):
+        """
+        Predict collapse scores for several poses in one model call
+        
+        Args:
+            keypoints_batch: Array of shape (N, 17, 2)
+            
+        Returns:
+            collapse_scores: Array of shape (N,)
+        """
+        input_vecs = np.asarray(keypoints_batch).reshape(len(keypoints_batch), -1)
+        if len(input_vecs) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if self.fast_model is not None:
+            return self.fast_model.predict(input_vecs)
+        input_vecs = self.scaler.transform(input_vecs)
+        if self.collapse_onnx is not None:
+            return self.collapse_onnx.run(input_vecs.astype(np.float32))[:, 0]
+        return self.collapse_model.predict(input_vecs, verbose=0)[:, 0]
+    
+    def export_fast_weights(self, path=default_folded_weights_path):
+        """
+        Save the collapse model with the scaler folded in, for NumpyCollapseModel.from_npz
+        
+        Args:
+            path: Output .npz path
+        """
+        if self.fast_model is None and self.collapse_model is None:
+            raise ValueError("Exporting folded weights needs the Keras collapse model (tensorflow backend)")
+        model = self.fast_model or NumpyCollapseModel.from_keras(
+            self.collapse_model, self.scaler.mean_, self.scaler.scale_)
+        model.save(path, self.training_data_hash)
+    
+    def _pad_crop(self, crop):
+        """Pad a crop to a centered square and resize to the MoveNet input size,
+        like tf.image.resize_with_pad. Returns (image, side, pad_top, pad_left)."""
+        h, w = crop.shape[:2]
+        side = max(h, w)
+        pad_top = (side - h) // 2
+        pad_left = (side - w) // 2
+        square = np.zeros((side, side, 3), dtype=crop.dtype)
+        square[pad_top:pad_top + h, pad_left:pad_left + w] = crop
+        return cv2.resize(square, (MOVENET_INPUT_SIZE, MOVENET_INPUT_SIZE)), side, pad_top, pad_left
+    
+    def detect_poses(self, frame, boxes):
+        """
+        Detect one pose per person box with a single batched MoveNet call
+        
+        Args:
+            frame: RGB image frame
+            boxes: Array of shape (N, 4) with pixel x1, y1, x2, y2 boxes
+            
+        Returns:
+            tuple: (crop_keypoints, frame_keypoints), both of shape (N, 17, 2).
+            crop_keypoints are normalized to each padded crop (what the collapse
+            model is scored on), frame_keypoints are normalized to the frame.
+        """
+        h, w = frame.shape[:2]
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        if len(boxes) == 0:
+            empty = np.zeros((0, 17, 2), dtype=np.float32)
+            return empty, empty
+        
+        inputs, geometry = [], []
+        for x1, y1, x2, y2 in boxes:
+            padded, side, pad_top, pad_left = self._pad_crop(frame[y1:y2, x1:x2])
+            inputs.append(padded)
+            geometry.append((x1, y1, side, pad_top, pad_left))
+        crop_keypoints = self._movenet_keypoints(np.stack(inputs))
+        
+        # Map (y, x) from padded-crop coordinates back to the full frame
+        x1, y1, side, pad_top, pad_left = (np.array(g, dtype=np.float32)[:, None] for g in zip(*geometry))
+        frame_keypoints = np.empty_like(crop_keypoints)
+        frame_keypoints[..., 0] = (y1 + crop_keypoints[..., 0] * side - pad_top) / h
+        frame_keypoints[..., 1] = (x1 + crop_keypoints[..., 1] * side - pad_left) / w
+        return crop_keypoints, frame_keypoints
+    
+    def process_tracks(self, frame, tracks, alpha=0.3, timestamp=None):
+        """
+        Score tracked people and keep a smoothed collapse score and state per track
+        
+        Args:
+            frame: BGR image frame from camera
+            tracks: pipeline.tracker.Track objects, e.g. from Tracker.step
+            alpha: EMA weight of the newest score
+            timestamp: Frame time in seconds (default: now)
+            
+        Returns:
+            list of process_people dicts with 'track_id', 'smoothed_score',
+            'state' and 'event' added (see collapse_scorer.StreamingCollapseScorer)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes = [track.int_box(frame.shape) for track in tracks]
+        results = self.process_people(frame, boxes)
+        for track, person in zip(tracks, results):
+            person['track_id'] = track.id
+            person['smoothed_score'] = track.smooth('collapse_score', person['score'], alpha)
+            scored = self.scorers.update(track.id, person['keypoints'], person['score'], timestamp)
+            person['state'] = scored['state']
+            person['event'] = scored['event']
+        return results
+    
+    @metrics.timed('collapse_process_people')
+    def process_people(self, frame, boxes):
+        """
+        Score every detected person in a frame for collapse
+        
+        Args:
+            frame: BGR image frame from camera
+            boxes: Person boxes (N, 4) in pixels, e.g. PeopleCropper.detect_boxes(frame)['box']
+            
+        Returns:
+            list of dicts with 'box', 'keypoints' (frame-normalized (17, 2))
+            and 'score', one per box
+        """
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        crop_keypoints, frame_keypoints = self.detect_poses(rgb_frame, boxes)
+        scores = self.predict_collapse_batch(crop_keypoints)
+        return [
+            {'box': tuple(int(v) for v in box), 'keypoints': keypoints, 'score': float(score)}
+            for box, keypoints, score in zip(np.asarray(boxes).reshape(-1, 4), frame_keypoints, scores)
+        ]
+    
     def draw_pose(self, frame, keypoints):
         """
         Draw pose skeleton on frame
@@ -134,39 +362,77 @@ class CollapseDetector:
             status = "LOW RISK"
         return color, status
     
-    def process_frame(self, frame):
+    def get_state_status(self, state):
         """
-        Process a single frame for pose detection and collapse prediction
+        Get status text and color for a rolling-window collapse state
         
         Args:
-            frame: BGR image frame from camera
+            state: 'normal', 'falling' or 'down'
             
         Returns:
-            tuple: (processed_frame, collapse_score, success)
+            tuple: (color, status_text)
+        """
+        return STATE_COLORS[state], state.upper()
+    
+    @metrics.timed('collapse_analyze_frame')
+    def analyze_frame(self, frame, timestamp=None):
+        """
+        Detect the pose in a frame and update its rolling-window collapse state
+        
+        Args:
+            frame: BGR image frame
+            timestamp: Frame time in seconds (default: now)
+            
+        Returns:
+            dict with 'timestamp', 'keypoints' (17, 2), 'score', 'status'
+            ('normal', 'falling' or 'down') and 'event' (state transition or None)
         """
         # Convert BGR to RGB for MoveNet
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        keypoints = self.detect_pose(rgb_frame)
+        collapse_score = self.predict_collapse(keypoints)
         
-        try:
-            # Detect pose
-            keypoints = self.detect_pose(rgb_frame)
-            
-            # Predict collapse score
-            collapse_score = self.predict_collapse(keypoints)
-            
-            # Draw pose skeleton
-            self.draw_pose(frame, keypoints)
-            
-            # Get risk status
-            color, status = self.get_risk_status(collapse_score)
-            
-            # Display collapse score and status
-            cv2.putText(frame, f'Collapse Score: {collapse_score:.3f}', (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            cv2.putText(frame, f'Status: {status}', (10, 60),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        # Status comes from the rolling window, so one high-scoring frame doesn't flip it to down
+        timestamp = time.time() if timestamp is None else timestamp
+        scored = self.scorers.update(0, keypoints, collapse_score, timestamp)
+        return {
+            'timestamp': timestamp,
+            'keypoints': keypoints,
+            'score': float(collapse_score),
+            'status': scored['state'],
+            'event': scored['event'],
+        }
+    
+    def draw_overlay(self, frame, result):
+        """
+        Draw the pose skeleton, collapse score and status from analyze_frame onto frame
+        """
+        self.draw_pose(frame, result['keypoints'])
+        color, status = self.get_state_status(result['status'])
+        cv2.putText(frame, f'Collapse Score: {result["score"]:.3f}', (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.putText(frame, f'Status: {status}', (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        return frame
+    
+    @metrics.timed('collapse_process_frame')
+    def process_frame(self, frame, timestamp=None):
+        """
+        Process a single frame for pose detection and collapse prediction
+        
+        Args:
+            frame: BGR image frame from camera
+            timestamp: Frame time in seconds (default: now)
             
-            return frame, collapse_score, True
+        Returns:
+            tuple: (processed_frame, collapse_score, success)
+        """
+        try:
+            result = self.analyze_frame(frame, timestamp)
+            if result['event'] is not None:
+                print(f"Collapse state: {result['event']['from']} -> {result['event']['to']}")
+            self.draw_overlay(frame, result)
+            return frame, result['score'], True
             
         except Exception as e:
             print(f"Error processing frame: {e}")
@@ -174,6 +440,27 @@ class CollapseDetector:
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             return frame, None, False
     
+    def process_frame_multi(self, frame, boxes):
+        """
+        Process a frame with several people and draw a pose and score per person
+        
+        Args:
+            frame: BGR image frame from camera
+            boxes: Person boxes (N, 4) in pixels
+            
+        Returns:
+            tuple: (processed_frame, results) with results as in process_people
+        """
+        results = self.process_people(frame, boxes)
+        for person in results:
+            self.draw_pose(frame, person['keypoints'])
+            color, status = self.get_risk_status(person['score'])
+            x1, y1, x2, y2 = person['box']
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(frame, f'{status} {person["score"]:.2f}', (x1, max(y1 - 8, 15)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        return frame, results
+    
     def run_realtime_detection(self, camera_index=0):
         """
         Run real-time collapse detection using webcam
@@ -209,12 +496,157 @@ class CollapseDetector:
         cap.release()
         cv2.destroyAllWindows()
         print("Detection stopped.")
+    
+    def iter_source(self, source, stride=1, overlay=False, max_frames=None):
+        """
+        Analyze a video file, stream URL or camera index without a display
+        
+        Frames are read as fast as the source delivers them; skipped frames
+        are grabbed but not decoded.
+        
+        Args:
+            source: Video file path, stream URL (rtsp://, http://) or camera index
+            stride: Analyze every stride-th frame
+            overlay: Also yield the frame with the pose and status drawn on it
+            max_frames: Stop after this many analyzed frames
+            
+        Yields:
+            tuple: (result, frame) with result as in analyze_frame plus 'frame'
+            (source frame index), and frame drawn on if overlay is set, else None
+            
+        The source frame rate (30 when the source doesn't report one) is kept
+        in self.source_fps while iterating.
+        """
+        if stride < 1:
+            raise ValueError(f"stride must be at least 1, got {stride}")
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video source {source}")
+        
+        # Files use their own clock; cameras and streams use wall time
+        live = isinstance(source, int) or '://' in source
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps != fps:
+            fps = 30.0
+        self.source_fps = fps
+        
+        index = -1
+        analyzed = 0
+        try:
+            while max_frames is None or analyzed < max_frames:
+                index += 1
+                if index % stride:
+                    if not cap.grab():
+                        break
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                timestamp = time.time() if live else index / fps
+                try:
+                    result = self.analyze_frame(frame, timestamp)
+                except Exception as e:
+                    print(f"Error processing frame {index}: {e}", file=sys.stderr)
+                    result = {'timestamp': timestamp, 'keypoints': None, 'score': None,
+                              'status': None, 'event': None}
+                result['frame'] = index
+                analyzed += 1
+                
+                if overlay and result['keypoints'] is not None:
+                    self.draw_overlay(frame, result)
+                yield result, frame if overlay else None
+        finally:
+            cap.release()
+    
+    def run_headless(self, source, stride=1, output=None, overlay_path=None, max_frames=None):
+        """
+        Write JSON-lines results for a source and report the achieved FPS
+        
+        Each line has 'frame', 'timestamp', 'keypoints', 'score' and 'status';
+        the lines can be replayed with collapse_scorer.py.
+        
+        Args:
+            source: Video file path, stream URL or camera index
+            stride: Analyze every stride-th frame
+            output: File object for the JSON lines (default: stdout)
+            overlay_path: Also write an annotated video here (opt-in, costs drawing and encoding time)
+            max_frames: Stop after this many analyzed frames
+            
+        Returns:
+            dict with 'frames', 'elapsed' and 'fps' (analyzed frames per second)
+        """
+        output = output or sys.stdout
+        writer = None
+        frames = 0
+        start = time.perf_counter()
+        
+        try:
+            for result, frame in self.iter_source(source, stride, overlay_path is not None, max_frames):
+                keypoints = result['keypoints']
+                record = {
+                    'frame': result['frame'],
+                    'timestamp': round(result['timestamp'], 3),
+                    'keypoints': None if keypoints is None else np.round(keypoints, 4).tolist(),
+                    'score': None if result['score'] is None else round(result['score'], 4),
+                    'status': result['status'],
+                }
+                output.write(json.dumps(record) + '\n')
+                frames += 1
+                
+                if frame is not None:
+                    if writer is None:
+                        h, w = frame.shape[:2]
+                        # Keep the source's playback speed with only every stride-th frame written
+                        writer = cv2.VideoWriter(overlay_path, cv2.VideoWriter_fourcc(*'mp4v'),
+                                                 max(1.0, self.source_fps / stride), (w, h))
+                    writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+            output.flush()
+        
+        elapsed = time.perf_counter() - start
+        stats = {'frames': frames, 'elapsed': elapsed, 'fps': frames / elapsed if elapsed > 0 else 0.0}
+        print(f"Analyzed {frames} frames in {elapsed:.2f}s ({stats['fps']:.1f} FPS)", file=sys.stderr)
+        return stats
 
 
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
 def main():
     """Main function to demonstrate the CollapseDetector class"""
-    detector = CollapseDetector()
-    detector.run_realtime_detection()
+    parser = argparse.ArgumentParser(description="Pose-based collapse detection")
+    parser.add_argument('--source', help="Video file, stream URL or camera index to analyze headless; "
+                                         "without it the webcam is shown in a window")
+    parser.add_argument('--stride', type=positive_int, default=1, help="Analyze every n-th frame")
+    parser.add_argument('--output', help="JSON-lines output file (default: stdout)")
+    parser.add_argument('--overlay', help="Write an annotated video to this path")
+    parser.add_argument('--max-frames', type=int, help="Stop after this many analyzed frames")
+    parser.add_argument('--fast-path', action='store_true', help="Score with the NumPy collapse model")
+    parser.add_argument('--backend', choices=['tensorflow', 'onnx'], default=default_backend,
+                        help="Inference runtime for MoveNet and the collapse model")
+    args = parser.parse_args()
+    
+    if args.source is None:
+        CollapseDetector(fast_path=args.fast_path, backend=args.backend).run_realtime_detection()
+        return
+    
+    # Keep stdout for JSON lines; progress messages go to stderr
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            detector = CollapseDetector(fast_path=args.fast_path, backend=args.backend)
+            detector.run_headless(args.source, args.stride, output, args.overlay, args.max_frames)
+    finally:
+        if args.output:
+            output.close()
 
 
 if __name__ == "__main__":
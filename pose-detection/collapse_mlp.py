@@ -0,0 +1,95 @@
+import numpy as np
+
+FOLDED_WEIGHTS_VERSION = 1
+default_folded_weights_path = 'pose-detection/collapseModel_folded.npz'
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+}
+
+class NumpyCollapseModel:
+    """Pure-NumPy forward pass of the collapse MLP with the scaler folded in.
+
+    Takes raw (unscaled) flattened keypoint vectors, so no StandardScaler or
+    Keras call is needed at inference time.
+    """
+
+    def __init__(self, layers):
+        # layers: list of (weights, bias, activation name)
+        self.layers = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32), act)
+                       for w, b, act in layers]
+
+    @classmethod
+    def from_keras(cls, keras_model, scaler_mean, scaler_scale):
+        """
+        Fold StandardScaler parameters into the first Dense layer of a Keras model
+
+        (x - mean) / scale @ W + b == x @ (W / scale[:, None]) + (b - (mean / scale) @ W)
+        """
+        layers = []
+        for layer in keras_model.layers:
+            kind = type(layer).__name__
+            if kind in ('Dropout', 'InputLayer', 'Flatten'):
+                continue
+            if kind != 'Dense':
+                raise ValueError(f"Unsupported layer type for NumPy fast path: {kind}")
+            weights, bias = layer.get_weights()
+            layers.append((weights, bias, layer.get_config()['activation']))
+
+        mean = np.asarray(scaler_mean, dtype=np.float64)
+        scale = np.asarray(scaler_scale, dtype=np.float64)
+        weights, bias, act = layers[0]
+        folded_weights = weights / scale[:, None]
+        folded_bias = bias - (mean / scale) @ weights
+        layers[0] = (folded_weights, folded_bias, act)
+        return cls(layers)
+
+    @classmethod
+    def from_npz(cls, path=default_folded_weights_path, csv_hash=None):
+        """
+        Load weights written by save
+
+        Args:
+            path: .npz file with the folded weights
+            csv_hash: sha256 of the training CSV the scaler is fitted on; if given,
+                weights folded with a scaler from other training data are rejected
+
+        Raises:
+            ValueError: if the file is from another version or other training data
+        """
+        data = np.load(path)
+        if 'version' not in data or int(data['version']) != FOLDED_WEIGHTS_VERSION:
+            raise ValueError(f"Folded weights {path} are from an older version, re-export them")
+        if csv_hash is not None and str(data['csv_hash']) != csv_hash:
+            raise ValueError(f"Folded weights {path} were folded with a scaler from other training data")
+        count = int(data['num_layers'])
+        return cls([(data[f'w{i}'], data[f'b{i}'], str(data[f'act{i}'])) for i in range(count)])
+
+    def save(self, path=default_folded_weights_path, csv_hash=''):
+        # csv_hash identifies the training data of the folded-in scaler, like scaler_cache
+        arrays = {'version': np.array(FOLDED_WEIGHTS_VERSION), 'csv_hash': np.array(csv_hash),
+                  'num_layers': np.array(len(self.layers))}
+        for i, (w, b, act) in enumerate(self.layers):
+            arrays[f'w{i}'] = w
+            arrays[f'b{i}'] = b
+            arrays[f'act{i}'] = np.array(act)
+        np.savez(path, **arrays)
+        print(f"Saved folded collapse model weights to {path}")
+
+    def predict(self, input_vecs):
+        """
+        Score a batch of flattened keypoint vectors
+
+        Args:
+            input_vecs: Array of shape (N, 34), unscaled
+
+        Returns:
+            collapse_scores: Array of shape (N,)
+        """
+        x = np.asarray(input_vecs, dtype=np.float32)
+        for weights, bias, act in self.layers:
+            x = ACTIVATIONS[act](x @ weights + bias)
+        return x[:, 0]
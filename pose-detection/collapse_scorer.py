@@ -0,0 +1,183 @@
+import json
+import sys
+import numpy as np
+
+LEFT_HIP = 11
+RIGHT_HIP = 12
+
+NORMAL = "normal"
+FALLING = "falling"
+DOWN = "down"
+
+STATE_COLORS = {
+    NORMAL: (0, 255, 0),     # Green
+    FALLING: (0, 165, 255),  # Orange
+    DOWN: (0, 0, 255),       # Red
+}
+
+class StreamingCollapseScorer:
+    """Rolling-window collapse state for one person
+
+    Keeps fixed-size ring buffers of recent keypoints and collapse scores and
+    updates an EMA of the score and of the hip drop rate in O(1) per frame.
+    The state moves normal -> falling -> down with separate enter and exit
+    thresholds, so a single-frame spike doesn't raise an alert.
+    """
+
+    def __init__(self, window=15, ema_alpha=0.3, velocity_alpha=0.5,
+                 falling_enter=0.6, falling_exit=0.4, down_enter=0.7, down_exit=0.4,
+                 fall_rate_enter=0.5, fall_rate_exit=0.1, min_down_frames=5):
+        """
+        Args:
+            window: number of frames kept in the ring buffers
+            ema_alpha: EMA weight of the newest collapse score
+            velocity_alpha: EMA weight of the newest hip drop rate
+            falling_enter, falling_exit: score EMA thresholds for entering / leaving falling
+            down_enter, down_exit: window median thresholds for entering / leaving down
+            fall_rate_enter, fall_rate_exit: hip drop rate in frame heights per second
+            min_down_frames: consecutive frames above down_enter before reporting down
+        """
+        self.window = window
+        self.keypoints = np.zeros((window, 17, 2), dtype=np.float32)
+        self.scores = np.zeros(window, dtype=np.float32)
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+        self.ema_alpha = ema_alpha
+        self.velocity_alpha = velocity_alpha
+        self.falling_enter = falling_enter
+        self.falling_exit = falling_exit
+        self.down_enter = down_enter
+        self.down_exit = down_exit
+        self.fall_rate_enter = fall_rate_enter
+        self.fall_rate_exit = fall_rate_exit
+        self.min_down_frames = min_down_frames
+
+        self.score_ema = None
+        self.hip_drop_rate = 0.0
+        self.down_frames = 0
+        self.state = NORMAL
+
+    def _hip_height(self, keypoints):
+        # MoveNet keypoints are (y, x); larger y is lower in the frame
+        return float((keypoints[LEFT_HIP, 0] + keypoints[RIGHT_HIP, 0]) / 2)
+
+    def median_score(self):
+        return float(np.median(self.scores[:self.count])) if self.count else 0.0
+
+    def update(self, keypoints, score, timestamp):
+        """
+        Add one frame and advance the state machine
+
+        Args:
+            keypoints: Array of shape (17, 2) with normalized (y, x) coordinates
+            score: Collapse score for this frame
+            timestamp: Frame time in seconds
+
+        Returns:
+            dict with 'state', 'score_ema', 'median_score', 'hip_drop_rate' and
+            'event' ({'from', 'to', 'timestamp'} on a transition, else None)
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(17, 2)
+        if self.count:
+            previous = (self.index - 1) % self.window
+            dt = timestamp - self.timestamps[previous]
+            if dt > 0:
+                rate = (self._hip_height(keypoints) - self._hip_height(self.keypoints[previous])) / dt
+                self.hip_drop_rate = self.velocity_alpha * rate + (1 - self.velocity_alpha) * self.hip_drop_rate
+
+        self.keypoints[self.index] = keypoints
+        self.scores[self.index] = score
+        self.timestamps[self.index] = timestamp
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+        score = float(score)
+        self.score_ema = score if self.score_ema is None else (
+            self.ema_alpha * score + (1 - self.ema_alpha) * self.score_ema)
+        self.down_frames = self.down_frames + 1 if score > self.down_enter else 0
+        median = self.median_score()
+
+        new_state = self.state
+        if self.state == NORMAL:
+            if self.hip_drop_rate > self.fall_rate_enter or self.score_ema > self.falling_enter:
+                new_state = FALLING
+        elif self.state == FALLING:
+            if median > self.down_enter and self.down_frames >= self.min_down_frames:
+                new_state = DOWN
+            elif self.score_ema < self.falling_exit and self.hip_drop_rate < self.fall_rate_exit:
+                new_state = NORMAL
+        elif self.state == DOWN:
+            if median < self.down_exit:
+                new_state = NORMAL
+
+        event = None
+        if new_state != self.state:
+            event = {'from': self.state, 'to': new_state, 'timestamp': timestamp}
+            self.state = new_state
+
+        return {
+            'state': self.state,
+            'score_ema': self.score_ema,
+            'median_score': median,
+            'hip_drop_rate': self.hip_drop_rate,
+            'event': event,
+        }
+
+class ScorerBank:
+    """One StreamingCollapseScorer per tracked person, dropped when the track goes stale"""
+
+    def __init__(self, max_idle=5.0, **scorer_args):
+        self.scorers = {}
+        self.last_seen = {}
+        self.max_idle = max_idle
+        self.scorer_args = scorer_args
+
+    def update(self, person_id, keypoints, score, timestamp):
+        scorer = self.scorers.get(person_id)
+        if scorer is None:
+            scorer = self.scorers[person_id] = StreamingCollapseScorer(**self.scorer_args)
+        self.last_seen[person_id] = timestamp
+        result = scorer.update(keypoints, score, timestamp)
+
+        for stale in [pid for pid, seen in self.last_seen.items() if timestamp - seen > self.max_idle]:
+            del self.scorers[stale]
+            del self.last_seen[stale]
+        return result
+
+def replay(records, **scorer_args):
+    """
+    Run recorded frames through a ScorerBank and collect state transitions
+
+    Args:
+        records: iterable of dicts with 'timestamp', 'keypoints', 'score' and
+            optionally 'person_id' (JSON lines from the headless pipeline work)
+
+    Returns:
+        list of transition events with 'person_id' added
+    """
+    bank = ScorerBank(**scorer_args)
+    events = []
+    for record in records:
+        if record.get('score') is None:
+            continue
+        person_id = record.get('person_id', 0)
+        result = bank.update(person_id, record['keypoints'], record['score'], record['timestamp'])
+        if result['event'] is not None:
+            events.append(dict(result['event'], person_id=person_id))
+    return events
+
+def main():
+    """Replay a JSON-lines keypoint recording and print state transitions"""
+    if len(sys.argv) != 2:
+        print("Usage: python pose-detection/collapse_scorer.py recording.jsonl")
+        return
+    with open(sys.argv[1]) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for event in replay(records):
+        print(f"[{event['timestamp']:.2f}] person {event['person_id']}: {event['from']} -> {event['to']}")
+
+
+if __name__ == "__main__":
+    main()
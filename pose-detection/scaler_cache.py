@@ -0,0 +1,66 @@
+import hashlib
+import os
+import numpy as np
+
+SCALER_CACHE_VERSION = 1
+default_scaler_path = 'pose-detection/collapseModel_scaler.npz'
+
+class KeypointScaler:
+    """Standardizes keypoint vectors like sklearn's StandardScaler, from stored parameters"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fit_scaler_params(training_data_path):
+    """
+    Compute StandardScaler mean and scale from the training CSV
+
+    Args:
+        training_data_path: CSV with a header row and the label in the last column
+
+    Returns:
+        tuple: (mean, scale) arrays of shape (34,)
+    """
+    data = np.loadtxt(training_data_path, delimiter=',', skiprows=1, ndmin=2)
+    X = data[:, :-1]
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    # StandardScaler leaves constant features unscaled
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+def load_scaler(training_data_path, cache_path=default_scaler_path):
+    """
+    Load the keypoint scaler, refitting only when the training CSV changed
+
+    Args:
+        training_data_path: CSV the scaler is fitted on
+        cache_path: .npz artifact holding the fitted parameters
+
+    Returns:
+        KeypointScaler
+    """
+    csv_hash = hash_file(training_data_path)
+
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if int(cached['version']) == SCALER_CACHE_VERSION and str(cached['csv_hash']) == csv_hash:
+            return KeypointScaler(cached['mean'], cached['scale'])
+        print(f"Scaler cache {cache_path} is stale, refitting...")
+
+    mean, scale = fit_scaler_params(training_data_path)
+    np.savez(cache_path, version=np.array(SCALER_CACHE_VERSION), csv_hash=np.array(csv_hash),
+             mean=mean, scale=scale)
+    print(f"Saved scaler parameters to {cache_path}")
+    return KeypointScaler(mean, scale)
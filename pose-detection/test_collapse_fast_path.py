@@ -0,0 +1,57 @@
+import tensorflow as tf
+import numpy as np
+import pandas as pd
+import time
+from sklearn.preprocessing import StandardScaler
+from scaler_cache import fit_scaler_params
+from collapse_mlp import NumpyCollapseModel
+
+model_path = 'pose-detection/collapseModel.h5'
+training_data_path = 'pose-detection/pose_labels.csv'
+
+# Parity check of the folded NumPy collapse model against the Keras .h5 model
+df = pd.read_csv(training_data_path)
+X = df.drop("label", axis=1).values
+scaler = StandardScaler()
+scaler.fit(X)
+
+# The cached scaler parameters must match sklearn's fit
+mean, scale = fit_scaler_params(training_data_path)
+np.testing.assert_allclose(mean, scaler.mean_, rtol=1e-10)
+np.testing.assert_allclose(scale, scaler.scale_, rtol=1e-10)
+print("Scaler parameters match StandardScaler")
+
+collapse_model = tf.keras.models.load_model(model_path)
+fast_model = NumpyCollapseModel.from_keras(collapse_model, scaler.mean_, scaler.scale_)
+
+start = time.perf_counter()
+expected = collapse_model.predict(scaler.transform(X), verbose=0)[:, 0]
+keras_time = time.perf_counter() - start
+
+start = time.perf_counter()
+actual = fast_model.predict(X)
+numpy_time = time.perf_counter() - start
+
+np.testing.assert_allclose(actual, expected, atol=1e-5)
+print(f"Parity OK on {len(X)} poses, max abs diff {np.max(np.abs(actual - expected)):.2e}")
+
+# Round trip through the exported weights
+fast_model.save('/tmp/collapseModel_folded.npz')
+reloaded = NumpyCollapseModel.from_npz('/tmp/collapseModel_folded.npz')
+np.testing.assert_allclose(reloaded.predict(X), actual, atol=1e-7)
+print("Export round trip OK")
+
+# Single-vector latency, the per-frame case
+single = X[:1]
+runs = 200
+start = time.perf_counter()
+for _ in range(runs):
+    collapse_model.predict(scaler.transform(single), verbose=0)
+keras_single = (time.perf_counter() - start) / runs
+start = time.perf_counter()
+for _ in range(runs):
+    fast_model.predict(single)
+numpy_single = (time.perf_counter() - start) / runs
+
+print(f"Batch of {len(X)}: keras {keras_time * 1000:.2f} ms, numpy {numpy_time * 1000:.2f} ms")
+print(f"Single vector: keras {keras_single * 1000:.3f} ms, numpy {numpy_single * 1000:.3f} ms")
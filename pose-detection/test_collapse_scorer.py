@@ -0,0 +1,50 @@
+import numpy as np
+from collapse_scorer import StreamingCollapseScorer, replay, NORMAL, FALLING, DOWN
+
+training_data_path = 'pose-detection/pose_labels.csv'
+fps = 10
+
+# Recorded poses from the training data; one standing and one collapsed pose
+# are interpolated into a keypoint stream with a little jitter
+data = np.loadtxt(training_data_path, delimiter=',', skiprows=1)
+standing = data[data[:, -1] == 0, :-1].reshape(-1, 17, 2)[0]
+collapsed = data[data[:, -1] == 1, :-1].reshape(-1, 17, 2)[0]
+rng = np.random.default_rng(0)
+
+def hold(pose, n):
+    return pose + rng.normal(0, 0.002, (n, 17, 2))
+
+def move(start, end, n):
+    return np.stack([start + (end - start) * t for t in np.linspace(0, 1, n)])
+
+def sequence(poses, scores):
+    return [{'timestamp': i / fps, 'keypoints': kp.tolist(), 'score': float(s)}
+            for i, (kp, s) in enumerate(zip(poses, scores))]
+
+# A single-frame spike while standing must not leave normal
+scores = np.full(30, 0.1)
+scores[15] = 0.95
+events = replay(sequence(hold(standing, 30), scores))
+assert events == [], events
+print("Single-frame spike: no transitions")
+
+# Standing, collapsing, lying down, then getting back up
+poses = np.concatenate([hold(standing, 20), move(standing, collapsed, 5), hold(collapsed, 30),
+                        move(collapsed, standing, 5), hold(standing, 40)])
+scores = np.concatenate([rng.uniform(0.0, 0.2, 20), np.linspace(0.1, 0.9, 5), rng.uniform(0.8, 1.0, 30),
+                         np.linspace(0.9, 0.1, 5), rng.uniform(0.0, 0.2, 40)])
+events = replay(sequence(poses, scores))
+states = [e['to'] for e in events]
+assert states == [FALLING, DOWN, NORMAL], states
+times = ', '.join('%.1fs' % e['timestamp'] for e in events)
+print(f"Collapse and recovery: {' -> '.join([NORMAL] + states)} at {times}")
+
+# Scores flickering across 0.7 flip a single-frame threshold every frame,
+# the rolling window changes state at most once
+scorer = StreamingCollapseScorer()
+flicker = [0.3 if i % 2 == 0 else 0.9 for i in range(40)]
+window_states = [scorer.update(standing, s, i / fps)['state'] for i, s in enumerate(flicker)]
+window_flips = sum(a != b for a, b in zip(window_states, window_states[1:]))
+threshold_flips = sum((a > 0.7) != (b > 0.7) for a, b in zip(flicker, flicker[1:]))
+assert window_flips <= 1 and DOWN not in window_states, window_states
+print(f"Flickering scores: {threshold_flips} threshold flips, {window_flips} state change(s)")
@@ -0,0 +1,32 @@
+import numpy as np
+import cv2
+from collapse_detector import CollapseDetector
+
+# Parity check of the ONNX MoveNet and collapse model against TensorFlow.
+# Run from the repo root after python -m pipeline.export_onnx --models movenet,collapse
+image_path = 'test-data/city.jpg'
+training_data_path = 'pose-detection/pose_labels.csv'
+
+tf_detector = CollapseDetector(backend='tensorflow')
+onnx_detector = CollapseDetector(backend='onnx')
+
+# Collapse MLP on every training pose
+X = np.loadtxt(training_data_path, delimiter=',', skiprows=1)[:, :-1].reshape(-1, 17, 2)
+expected = tf_detector.predict_collapse_batch(X)
+actual = onnx_detector.predict_collapse_batch(X)
+np.testing.assert_allclose(actual, expected, atol=1e-5)
+print(f"Collapse model parity OK on {len(X)} poses, max abs diff {np.max(np.abs(actual - expected)):.2e}")
+
+# MoveNet on the same padded input
+frame = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+padded = tf_detector._pad_crop(frame)[0][None]
+expected = tf_detector._movenet_keypoints(padded)
+actual = onnx_detector._movenet_keypoints(padded)
+np.testing.assert_allclose(actual, expected, atol=1e-3)
+print(f"MoveNet parity OK, max abs diff {np.max(np.abs(actual - expected)):.2e}")
+
+# End to end: the onnx backend pads with OpenCV instead of tf.image.resize_with_pad
+expected = tf_detector.detect_pose(frame)
+actual = onnx_detector.detect_pose(frame)
+print(f"detect_pose max abs diff {np.max(np.abs(actual - expected)):.2e}")
+assert np.max(np.abs(actual - expected)) < 0.02
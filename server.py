@@ -1,11 +1,23 @@
 import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
 from camera_input.camera_input import CameraInput
 from person_detection.people_cropper import PeopleCropper
-from flask import Flask, send_file
+from flask import Flask, send_file, request, jsonify, Response, stream_with_context
 import base64
 import msgpack
 from datetime import datetime, timedelta
 from weapon_detection.weapon_detector import WeaponDetector
+from pipeline.model_registry import registry
+from pipeline.metrics import metrics
+from pipeline.encoding import EncodingPolicy
+from pipeline.detector_pool import DetectorPool
+from pipeline.dispatcher import CoalescingDispatcher
+from pipeline.result_cache import ResultCache, parse_ttls
+from pipeline.motion_gate import MotionGate, parse_roi
 
 test_loc = "37.8688956,-122.2600617"
 
@@ -13,6 +25,52 @@ shared_screenshots_dir = "./shared/screenshots"
 shared_people_dir = "./shared/people"
 shared_weapon_dir = "./shared/weapon"
 
+# Camera index, video file path or "synthetic"
+camera_source = os.environ.get("CAMERA_SOURCE", "0")
+
+# Set PERSIST_TO_DISK=1 to also write frames and crops to the shared dirs
+persist_to_disk = os.environ.get("PERSIST_TO_DISK", "0") == "1"
+disk_writer = ThreadPoolExecutor(max_workers=1)
+
+# Requests arriving within this window share one capture and one inference per model
+coalesce_window = float(os.environ.get("COALESCE_WINDOW_MS", "20")) / 1000
+# Seconds a request waits for its coalesced batch before failing with a 500
+coalesce_timeout = float(os.environ.get("COALESCE_TIMEOUT", "30"))
+# Detection results are reused for the same or a visually identical frame within
+# the detector's TTL in seconds (0 disables caching for that detector)
+result_cache = ResultCache(
+    ttls=parse_ttls(os.environ.get("RESULT_CACHE_TTLS", "people=0.5,weapons=0.5,full=0")),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MB", "64")) * 1024 * 1024,
+)
+analyze_detectors = ('people', 'weapons', 'full')
+
+# Default encodings, overridable per request with ?format=jpeg|webp|png&quality=&max_edge=
+crop_encoding = EncodingPolicy('jpeg', quality=85)
+# Legacy (v1) consumers expect a PNG full frame; v2 clients get JPEG unless they ask otherwise
+full_encoding = EncodingPolicy('png')
+full_encoding_v2 = EncodingPolicy('jpeg', quality=85)
+
+# Serving: SERVER_MODE=production runs waitress with SERVER_THREADS request threads
+server_mode = os.environ.get("SERVER_MODE", "dev")
+server_host = os.environ.get("SERVER_HOST", "localhost")
+server_port = int(os.environ.get("SERVER_PORT", "8100"))
+server_threads = int(os.environ.get("SERVER_THREADS", os.cpu_count() or 4))
+# Detector instances per model; YOLOv5 already uses several intra-op threads per call
+people_detectors = int(os.environ.get("PEOPLE_DETECTORS", "2"))
+weapon_detectors = int(os.environ.get("WEAPON_DETECTORS", "1"))
+# Runs detectors side by side on a shared frame (both models release the GIL); overlapping
+# batches can keep every replica busy, plus one thread for the capture-only 'full' entry
+fanout_executor = ThreadPoolExecutor(max_workers=people_detectors + weapon_detectors + 1)
+
+# MOTION_GATE=1 skips detectors while the scene is static and returns their last result
+motion_gate_enabled = os.environ.get("MOTION_GATE", "0") == "1"
+motion_threshold = float(os.environ.get("MOTION_THRESHOLD", "0.01"))
+motion_roi = parse_roi(os.environ.get("MOTION_ROI", ""))
+motion_keepalive = float(os.environ.get("MOTION_KEEPALIVE", "5"))
+
+# Upper bound on the frame rate a /stream_full client can request
+max_stream_fps = 15
+
 if not os.path.exists(shared_screenshots_dir):
     os.makedirs(shared_screenshots_dir)
 if not os.path.exists(shared_people_dir):
@@ -21,102 +79,352 @@ if not os.path.exists(shared_weapon_dir):
     os.makedirs(shared_weapon_dir)
 
 # Test camera input
-camera = CameraInput(output_dir=shared_screenshots_dir)
+camera = CameraInput(camera_index=camera_source, output_dir=shared_screenshots_dir)
+camera.start_capture()
+
+# Detection models, one instance per concurrent inference
+people_pool = DetectorPool(lambda i: PeopleCropper(output_dir=shared_people_dir), people_detectors)
+weapon_pool = DetectorPool(lambda i: WeaponDetector(output_dir=shared_weapon_dir, replica=i), weapon_detectors)
+# Only used for save_crops, which doesn't touch the models
+people_cropper = people_pool.instances[0]
+weapon_detector = weapon_pool.instances[0]
+
+dispatch_detectors = {
+    'people': partial(people_pool.run, 'detect_array'),
+    'weapons': partial(weapon_pool.run, 'detect_array'),
+}
+motion_gates = {}
+if motion_gate_enabled:
+    for name in dispatch_detectors:
+        motion_gates[name] = MotionGate(name, threshold=motion_threshold, roi=motion_roi,
+                                        keepalive=motion_keepalive)
+        dispatch_detectors[name] = motion_gates[name].wrap(dispatch_detectors[name])
+dispatch_detectors['full'] = lambda image: None  # capture only
 
-# Detection models
-people_cropper = PeopleCropper(output_dir=shared_people_dir)
-weapon_detector = WeaponDetector(output_dir=shared_weapon_dir)
+dispatcher = CoalescingDispatcher(camera.grab_frame, dispatch_detectors, window=coalesce_window,
+                                  executor=fanout_executor, cache=result_cache)
 
 app = Flask(__name__)
 
+# Load and warm up registered models off the request path
+registry.warmup_async()
+
+@app.before_request
+def start_request_timing():
+    request.metrics_start = metrics.start_request(request.path)
+
+@app.after_request
+def end_request_timing(response):
+    started = getattr(request, 'metrics_start', None)
+    if started is not None:
+        metrics.end_request(request.path, response.status_code, started)
+    return response
+
+def protocol_version():
+    # ?v=2 or "Accept: application/x-msgpack; version=2" selects binary images,
+    # everything else gets the original base64 format
+    version = request.args.get('v')
+    if version is None:
+        match = re.search(r'application/x-msgpack\s*;\s*version=(\d+)', request.headers.get('Accept', ''))
+        version = match.group(1) if match else 1
+    try:
+        return int(version)
+    except ValueError:
+        return 1
+
+def encoding_policies(version):
+    """Crop and full-frame encoding policies for this request; raises ValueError on bad args"""
+    full_default = full_encoding_v2 if version >= 2 else full_encoding
+    return crop_encoding.override(request.args), full_default.override(request.args)
+
+def encode_image_bytes(img, policy=crop_encoding):
+    # Encode straight from memory instead of writing and re-reading a file
+    with metrics.stage('image_encode'):
+        return policy.encode(img)
+
+def encode_image(img, policy=crop_encoding):
+    img_bytes = encode_image_bytes(img, policy)
+    with metrics.stage('base64'):
+        return base64.b64encode(img_bytes).decode('utf-8')
+
+@metrics.timed('msgpack_pack')
+def pack_response(response):
+    return msgpack.packb(response, use_bin_type=True)
+
+def msgpack_response(response, version):
+    if version >= 2:
+        response['version'] = 2
+        content_type = 'application/x-msgpack; version=2'
+    else:
+        content_type = 'application/x-msgpack'
+    return pack_response(response), 200, {'Content-Type': content_type}
+
+def persist_async(fn, *args):
+    # Optional disk side-channel, kept off the request path
+    if persist_to_disk:
+        disk_writer.submit(fn, *args)
+        disk_writer.submit(remove_old_screenshots)
+
+def frame_name(frame):
+    return datetime.fromtimestamp(frame.timestamp).strftime("screenshot %m:%d~%H:%M:%S:%f.png")
+
+def coalesced_detect(names):
+    """Run detectors through the dispatcher; returns (frame, {name: result}) or (None, None)"""
+    try:
+        with metrics.stage('coalesced_wait'):
+            return dispatcher.submit(names).result(timeout=coalesce_timeout)
+    except FutureTimeoutError:
+        print(f"Coalesced detection timed out after {coalesce_timeout}s")
+        return None, None
+    except Exception as e:
+        print(f"Coalesced detection failed: {e}")
+        return None, None
+
+def crop_metadata(crop):
+    return {
+        'box': list(crop['box']),
+        'confidence': crop['confidence'],
+        'class': crop['class'],
+    }
+
+def crop_entries(crops, frame, policy):
+    # Protocol v2: one map per crop with the raw image bytes as a msgpack bin field
+    return [dict(crop_metadata(crop), image=encode_image_bytes(crop['image'], policy),
+                 format=policy.format, timestamp=frame.timestamp)
+            for crop in crops]
+
 @app.route('/screenshot_people', methods=['GET'])
 def screenshot_people():
     print("Taking screenshot and detecting people")
-    # Take screenshot using camera
-    filename = camera.take_screenshot()
+    version = protocol_version()
+    try:
+        crop_policy, full_policy = encoding_policies(version)
+    except ValueError as e:
+        return f"Invalid encoding: {e}", 400
+    # Capture and detection are shared with concurrent requests
+    frame, results = coalesced_detect(['people'])
     
-    if filename and os.path.exists(filename):
-        remove_old_screenshots()
-        # Process the image to detect people
-        people_filenames = people_cropper.detect(filename)
-        # Convert each cropped image to base64
-        if (people_filenames is None or len(people_filenames) == 0):
+    if frame is not None:
+        people_crops = results['people']
+        if (people_crops is None or len(people_crops) == 0):
             return "No people detected", 400
 
-        encoded_images = []
-        for person_file in people_filenames:
-            with open(person_file, 'rb') as f:
-                img_bytes = f.read()
-                img_b64 = base64.b64encode(img_bytes).decode('utf-8')
-                encoded_images.append(img_b64)
+        persist_async(people_cropper.save_crops, people_crops, frame_name(frame))
 
-        # Pack into messagepack format
-        response = {
-            'people_images': encoded_images,
-            "loc": test_loc,
-        }
-        packed_response = msgpack.packb(response)
+        response = {"loc": test_loc}
+        if version >= 2:
+            response['people'] = crop_entries(people_crops, frame, crop_policy)
+            response['timestamp'] = frame.timestamp
+        else:
+            # Convert each cropped image to base64
+            response['people_images'] = [encode_image(crop['image'], crop_policy) for crop in people_crops]
 
-        return packed_response, 200, {'Content-Type': 'application/x-msgpack'}
+        # Pack into messagepack format
+        return msgpack_response(response, version)
     else:
         return "Failed to take screenshot", 500
 
 @app.route('/screenshot_weapons', methods=['GET'])
 def screenshot_weapons():
     print("Taking screenshot and detecting weapons")
-    # Take screenshot using camera
-    filename = camera.take_screenshot()
+    version = protocol_version()
+    try:
+        crop_policy, full_policy = encoding_policies(version)
+    except ValueError as e:
+        return f"Invalid encoding: {e}", 400
+    # Capture and detection are shared with concurrent requests
+    frame, results = coalesced_detect(['weapons'])
     
-    if filename and os.path.exists(filename):
-        remove_old_screenshots()
-        # Process the image to detect weapons
-        weapon_filenames = weapon_detector.detect(filename)
-        # Convert each cropped image to base64
-        if (weapon_filenames is None or len(weapon_filenames) == 0):
+    if frame is not None:
+        weapon_crops = results['weapons']
+        if (weapon_crops is None or len(weapon_crops) == 0):
             return "No weapons detected", 400
 
-        encoded_images = []
-        for weapon_file in weapon_filenames:
-            with open(weapon_file, 'rb') as f:
-                img_bytes = f.read()
-                img_b64 = base64.b64encode(img_bytes).decode('utf-8')
-                encoded_images.append(img_b64)
+        persist_async(weapon_detector.save_crops, weapon_crops, frame_name(frame))
 
-        # Pack into messagepack format
-        response = {
-            'weapon_images': encoded_images,
-            "loc": test_loc,
-        }
-        packed_response = msgpack.packb(response)
+        response = {"loc": test_loc}
+        if version >= 2:
+            response['weapons'] = crop_entries(weapon_crops, frame, crop_policy)
+            response['timestamp'] = frame.timestamp
+        else:
+            # Convert each cropped image to base64
+            response['weapon_images'] = [encode_image(crop['image'], crop_policy) for crop in weapon_crops]
 
-        return packed_response, 200, {'Content-Type': 'application/x-msgpack'}
+        # Pack into messagepack format
+        return msgpack_response(response, version)
     else:
         return "Failed to take screenshot", 500
 
 @app.route('/screenshot_full', methods=['GET'])
 def screenshot_full():
     print("Taking screenshot")
-    # Take screenshot using camera
-    filename = camera.take_screenshot()
+    version = protocol_version()
+    try:
+        crop_policy, full_policy = encoding_policies(version)
+    except ValueError as e:
+        return f"Invalid encoding: {e}", 400
+    # The capture is shared with concurrent requests
+    frame, _ = coalesced_detect(['full'])
     
-    if filename and os.path.exists(filename):
-        remove_old_screenshots()
-        # Convert the image to base64
-        with open(filename, 'rb') as f:
-            img_bytes = f.read()
-            img_b64 = base64.b64encode(img_bytes).decode('utf-8')
+    if frame is not None:
+        persist_async(camera.save_frame, frame.image)
 
-        # Pack into messagepack format
-        response = {
-            'image': img_b64,
-            "loc": test_loc,
-        }
-        packed_response = msgpack.packb(response)
+        response = {"loc": test_loc}
+        if version >= 2:
+            response['image'] = encode_image_bytes(frame.image, full_policy)
+            response['format'] = full_policy.format
+            response['timestamp'] = frame.timestamp
+        else:
+            # Convert the image to base64
+            response['image'] = encode_image(frame.image, full_policy)
 
-        return packed_response, 200, {'Content-Type': 'application/x-msgpack'}
+        # Pack into messagepack format
+        return msgpack_response(response, version)
     else:
         return "Failed to take screenshot", 500
 
+@app.route('/screenshot_analyze', methods=['GET'])
+def screenshot_analyze():
+    # e.g. /screenshot_analyze?detectors=people,weapons,full
+    detectors = request.args.get('detectors', ','.join(analyze_detectors)).split(',')
+    detectors = [d.strip() for d in detectors if d.strip()]
+    unknown = [d for d in detectors if d not in analyze_detectors]
+    if unknown or not detectors:
+        return f"Unknown detectors: {', '.join(unknown)}", 400
+
+    print(f"Taking screenshot and running {', '.join(detectors)}")
+    version = protocol_version()
+    try:
+        crop_policy, full_policy = encoding_policies(version)
+    except ValueError as e:
+        return f"Invalid encoding: {e}", 400
+    # One capture shared by every detector, run side by side by the dispatcher
+    frame, results = coalesced_detect(detectors)
+    if frame is None:
+        return "Failed to take screenshot", 500
+
+    response = {
+        "loc": test_loc,
+        "timestamp": frame.timestamp,
+    }
+    if 'people' in results:
+        people_crops = results['people']
+        persist_async(people_cropper.save_crops, people_crops, frame_name(frame))
+        if version >= 2:
+            response['people'] = crop_entries(people_crops, frame, crop_policy)
+        else:
+            response['people_images'] = [encode_image(crop['image'], crop_policy) for crop in people_crops]
+            response['people'] = [crop_metadata(crop) for crop in people_crops]
+    if 'weapons' in results:
+        weapon_crops = results['weapons']
+        persist_async(weapon_detector.save_crops, weapon_crops, frame_name(frame))
+        if version >= 2:
+            response['weapons'] = crop_entries(weapon_crops, frame, crop_policy)
+        else:
+            response['weapon_images'] = [encode_image(crop['image'], crop_policy) for crop in weapon_crops]
+            response['weapons'] = [crop_metadata(crop) for crop in weapon_crops]
+    if 'full' in results:
+        persist_async(camera.save_frame, frame.image)
+        if version >= 2:
+            response['image'] = encode_image_bytes(frame.image, full_policy)
+            response['format'] = full_policy.format
+        else:
+            response['image'] = encode_image(frame.image, full_policy)
+
+    return msgpack_response(response, version)
+
+def stream_frames(fps, max_frames):
+    # Every stream reads from the shared capture ring buffer, never the device
+    interval = 1.0 / fps
+    sent = 0
+    last_timestamp = 0.0
+    while max_frames is None or sent < max_frames:
+        frame = camera.get_frame_after(last_timestamp + interval, timeout=2.0)
+        if frame is None:
+            if not camera.capturing:
+                return
+            continue
+        last_timestamp = frame.timestamp
+        yield frame
+        sent += 1
+        # Pace to the requested rate even when the camera runs faster
+        wait = last_timestamp + interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+@app.route('/stream_full', methods=['GET'])
+def stream_full():
+    """
+    Long-lived stream of full frames from the shared capture
+
+    ?mode=mjpeg (default) sends multipart/x-mixed-replace JPEG parts, viewable
+    in a browser. ?mode=msgpack sends length-prefixed protocol v2 msgpack
+    documents (4-byte big-endian length, then the document) over chunked transfer.
+    ?fps= sets the rate and ?max_frames= ends the stream after that many frames.
+    """
+    mode = request.args.get('mode', 'mjpeg')
+    try:
+        fps = min(float(request.args.get('fps', 1)), max_stream_fps)
+        max_frames = int(request.args['max_frames']) if 'max_frames' in request.args else None
+        policy = full_encoding_v2.override(request.args)
+    except ValueError as e:
+        return f"Invalid stream parameters: {e}", 400
+    if fps <= 0:
+        return "fps must be positive", 400
+    if mode == 'mjpeg' and policy.format != 'jpeg':
+        return "MJPEG streams must use format=jpeg", 400
+    if not camera.capturing:
+        camera.start_capture()
+
+    print(f"Starting {mode} stream at {fps} fps")
+
+    if mode == 'mjpeg':
+        def generate():
+            for frame in stream_frames(fps, max_frames):
+                img_bytes = encode_image_bytes(frame.image, policy)
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                       + f'Content-Length: {len(img_bytes)}\r\n\r\n'.encode()
+                       + img_bytes + b'\r\n')
+        return Response(stream_with_context(generate()),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    if mode == 'msgpack':
+        def generate():
+            for frame in stream_frames(fps, max_frames):
+                packed = pack_response({
+                    'version': 2,
+                    'image': encode_image_bytes(frame.image, policy),
+                    'format': policy.format,
+                    'timestamp': frame.timestamp,
+                    'seq': frame.seq,
+                    'loc': test_loc,
+                })
+                yield struct.pack('>I', len(packed)) + packed
+        return Response(stream_with_context(generate()),
+                        mimetype='application/x-msgpack-stream')
+
+    return f"Unknown stream mode: {mode}", 400
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return metrics.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    # Hit/miss counters per detector, also exported on /metrics
+    return jsonify(result_cache.stats())
+
+@app.route('/motion', methods=['GET'])
+def motion_stats():
+    # Fraction of frames each detector skipped because the scene was static
+    return jsonify({name: {'frames': gate.frames, 'skipped': gate.skipped, 'skip_ratio': gate.skip_ratio}
+                    for name, gate in motion_gates.items()})
+
+@app.route('/models', methods=['GET'])
+def models():
+    # Load time, warmup time and memory per model
+    return jsonify(registry.report())
+
 def remove_old_screenshots():
     # Get all png files in screenshots dir sorted by creation time
     screenshot_files = [f for f in os.listdir(shared_screenshots_dir) if f.endswith('.png')]
@@ -159,4 +467,10 @@ def remove_old_screenshots():
             print(f"Removed folder {folder}")
 
 if __name__ == '__main__':
-    app.run(host='localhost', port=8100)
+    if server_mode == 'production':
+        from waitress import serve
+        print(f"Serving on {server_host}:{server_port} with {server_threads} threads "
+              f"({len(people_pool)} people / {len(weapon_pool)} weapon detectors)")
+        serve(app, host=server_host, port=server_port, threads=server_threads)
+    else:
+        app.run(host=server_host, port=server_port, threaded=True)
@@ -0,0 +1,53 @@
+import numpy as np
+import cv2
+import torch
+from pipeline.model_registry import registry
+from pipeline.onnx_runtime import letterbox
+from pipeline.tracker import iou_matrix
+from weapon_detection.weapon_detector import WeaponDetector
+
+# Parity check of the ONNX export against the torch.hub YOLOv5 model.
+# Run from the repo root after python -m pipeline.export_onnx --models yolov5:
+#   python -m weapon_detection.test_onnx_parity
+image_path = 'test-data/city.jpg'
+
+torch_detector = WeaponDetector(output_dir='/tmp/parity_weapons', backend='torch')
+onnx_detector = WeaponDetector(output_dir='/tmp/parity_weapons', backend='onnx')
+image = cv2.imread(image_path)
+assert image is not None, f"Could not read image: {image_path}"
+
+# Raw network outputs on the same letterboxed input
+onnx_yolo = onnx_detector.model
+padded, _, _ = letterbox(image, onnx_yolo.size)
+inputs = np.ascontiguousarray(padded.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+network = torch_detector.model.model
+network = getattr(network, 'model', network)
+with torch.inference_mode():
+    expected = network(torch.from_numpy(inputs))[0].numpy()
+actual = onnx_yolo.model.run(inputs)
+np.testing.assert_allclose(actual, expected, rtol=1e-3, atol=1e-2)
+print(f"Raw output parity OK, max abs diff {np.max(np.abs(actual - expected)):.2e}")
+
+# Class names travel in the ONNX metadata
+torch_names = torch_detector.model.names
+torch_names = dict(enumerate(torch_names)) if isinstance(torch_names, (list, tuple)) else torch_names
+assert onnx_yolo.names == torch_names, "Class names differ"
+
+# Post-processed detections with a low threshold so there is something to compare
+torch_detector.model.conf = onnx_yolo.conf = 0.1
+expected = torch_detector.model([image], size=onnx_yolo.size).xyxy[0].cpu().numpy()
+actual = onnx_yolo([image])[0]
+print(f"torch: {len(expected)} detections, onnx: {len(actual)} detections")
+if len(expected) and len(actual):
+    ious = iou_matrix(expected[:, :4], actual[:, :4])
+    best = ious.argmax(axis=1)
+    matched = ious.max(axis=1) >= 0.9
+    same_class = expected[:, 5] == actual[best, 5]
+    print(f"{np.mean(matched & same_class):.0%} of torch detections matched at IoU >= 0.9 with the same class")
+    assert np.mean(matched & same_class) >= 0.9
+else:
+    assert len(expected) == len(actual) == 0
+
+# Cold start: model load time per backend, from the registry's stats
+for detector in (torch_detector, onnx_detector):
+    print(f"{detector.backend}: {registry.report()[detector.model_name]}")
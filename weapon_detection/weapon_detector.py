@@ -1,17 +1,44 @@
-import torch
 import cv2
 import os
-from PIL import Image
 import numpy as np
+from pipeline.batch_loader import iter_batches, list_images, load_image
+from pipeline.detections import filter_detections
+from pipeline.metrics import metrics
+from pipeline.model_registry import registry, load_yolov5
+from pipeline.runtime import configure_torch
+from pipeline.onnx_runtime import OnnxYoloV5, default_onnx_dir, YOLOV5_ONNX
+from functools import partial
 
 default_yolov5_model = 'weapon_detection/yolov5s.pt'
 default_output_dir = "weapon_detection/weapons"
 
+# Inference resolution; 416 or 320 trade small-object recall for CPU latency
+default_img_size = int(os.environ.get("WEAPON_IMG_SIZE", "640"))
+
+# WEAPON_BACKEND=onnx runs the export from pipeline.export_onnx on ONNX Runtime,
+# without torch or the ultralytics repo
+default_backend = os.environ.get("WEAPON_BACKEND", "torch")
+default_onnx_model = os.path.join(default_onnx_dir, YOLOV5_ONNX)
+
 class_names = ["knife", "pistol"]
+# YOLOv5 confidence threshold applied inside the model, before the weapon class filter
+default_model_conf = 0.25
 
 class WeaponDetector:
-    def __init__(self, model_path=default_yolov5_model, output_dir=default_output_dir):
+    def __init__(self, model_path=default_yolov5_model, output_dir=default_output_dir, replica=0,
+                 img_size=default_img_size, backend=default_backend, onnx_path=default_onnx_model):
         self.output_dir = output_dir
+        self.img_size = img_size
+        self.backend = backend
+
+        if backend == 'onnx':
+            model_path = onnx_path
+            loader = lambda cache_dir: self._load_onnx(onnx_path)
+        elif backend == 'torch':
+            configure_torch()
+            loader = partial(self._load_torch, model_path)
+        else:
+            raise ValueError(f"Unknown weapon detector backend {backend}, expected torch or onnx")
 
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
@@ -19,57 +46,141 @@ class WeaponDetector:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Load YOLOv5 model using torch hub
-        self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path, force_reload=False)
-        self.model.conf = 0.25  # confidence threshold
+        # YOLOv5 is loaded through the model registry on first use; replicas
+        # get their own model instance so they can run on separate threads
+        self.model_name = f"yolov5:{model_path}" if replica == 0 else f"yolov5:{model_path}#{replica}"
+        registry.register(self.model_name, loader, warmup=self._warmup)
+        self._weapon_class_ids = None
 
-        # Get class indices for weapons
-        self.weapon_class_ids = []
-        for class_id, name in self.model.names.items():
-            if name.lower() in ['knife', 'pistol']:
-                self.weapon_class_ids.append(class_id)
-        if not self.weapon_class_ids:
-            raise ValueError("The model does not contain weapon classes (knife, pistol).")
+    @property
+    def model(self):
+        return registry.get(self.model_name)
 
-    def _detect(self, imgfile):
-        orig_img = cv2.imread(imgfile)
-        if orig_img is None:
-            raise ValueError(f"Could not read image: {imgfile}")
-        results = self.model(orig_img)
-        detections = results.xyxy[0]  # [x1, y1, x2, y2, conf, class]
-
-        weapon_crops = []
-        for det in detections:
-            x1, y1, x2, y2, conf, cls = det
-            if int(cls) in self.weapon_class_ids and conf > 0.4:
-                x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
-                cropped = orig_img[y1:y2, x1:x2]
-                weapon_name = self.model.names[int(cls)]
-                weapon_crops.append((cropped, float(conf), weapon_name))
-        return weapon_crops
-
-    def detect_dir(self, directory):
-        for f in os.listdir(directory):
-            if f.lower().endswith((".jpg", ".jpeg", ".png")):
-                self.detect(os.path.join(directory, f))
+    @property
+    def weapon_class_ids(self):
+        if self._weapon_class_ids is None:
+            # Get class indices for weapons
+            weapon_class_ids = []
+            for class_id, name in self.model.names.items():
+                if name.lower() in ['knife', 'pistol']:
+                    weapon_class_ids.append(class_id)
+            if not weapon_class_ids:
+                raise ValueError("The model does not contain weapon classes (knife, pistol).")
+            self._weapon_class_ids = weapon_class_ids
+        return self._weapon_class_ids
+
+    @staticmethod
+    def _load_torch(model_path, cache_dir):
+        model = load_yolov5(model_path, cache_dir)
+        model.conf = default_model_conf
+        return model
+
+    def _load_onnx(self, onnx_path):
+        model = OnnxYoloV5(onnx_path, conf=default_model_conf)
+        # The export fixes the input size; a different WEAPON_IMG_SIZE would be silently ignored
+        if model.size != self.img_size:
+            raise ValueError(f"{onnx_path} was exported at {model.size}px but img_size is {self.img_size}; "
+                             f"re-export with python -m pipeline.export_onnx --models yolov5 "
+                             f"--img-size {self.img_size} or set WEAPON_IMG_SIZE={model.size}")
+        return model
+
+    @staticmethod
+    def _warmup(model):
+        model([np.zeros((640, 640, 3), dtype=np.uint8)])
+
+    def _detect_batch(self, orig_imgs):
+        if self.backend == 'onnx':
+            # Input size is fixed by the export
+            batch_detections = self.model(list(orig_imgs))
+        else:
+            # The hub model takes a list of images and runs them as one batch
+            results = self.model(list(orig_imgs), size=self.img_size)
+            batch_detections = [detections.cpu().numpy() for detections in results.xyxy]
+        return [self._postprocess(orig_img, detections)
+                for orig_img, detections in zip(orig_imgs, batch_detections)]
+
+    def _postprocess(self, orig_img, detections):
+        # detections rows are [x1, y1, x2, y2, conf, class]
+        return filter_detections(detections[:, :4], detections[:, 4], detections[:, 5],
+                                 self.weapon_class_ids, 0.4, orig_img.shape)
+
+    def _detect(self, orig_img):
+        return self._detect_batch([orig_img])[0]
 
+    def detect_boxes(self, frame):
+        """
+        Detect weapons in a BGR image without cropping
+
+        Returns a structured array of pipeline.detections.detection_dtype.
+        """
+        return self._detect(frame)
+
+    @metrics.timed('weapon_detect')
+    def detect_array(self, frame):
+        """
+        Detect weapons in an in-memory BGR image
+
+        Returns a list of dicts with keys 'image' (the crop), 'box'
+        (x1, y1, x2, y2), 'confidence' and 'class'. Boxes are clipped to
+        the image and crops smaller than 10px on either side are dropped.
+        """
+        return self._to_crops(frame, self._detect(frame))
+
+    @metrics.timed('weapon_detect_batch')
+    def detect_batch(self, frames):
+        """
+        Detect weapons in a list of BGR images and/or image paths in one forward pass
+
+        Returns one detect_array-style crop list per input.
+        """
+        frames = [load_image(f) for f in frames]
+        return [self._to_crops(frame, detections)
+                for frame, detections in zip(frames, self._detect_batch(frames))]
+
+    def _to_crops(self, orig_img, detections):
+        crops = []
+        for (x1, y1, x2, y2), confidence, class_id in zip(detections['box'].tolist(),
+                                                           detections['confidence'].tolist(),
+                                                           detections['class_id'].tolist()):
+            crops.append({
+                'image': orig_img[y1:y2, x1:x2],
+                'box': (x1, y1, x2, y2),
+                'confidence': confidence,
+                'class': self.model.names[class_id],
+            })
+        return crops
+
+    def save_crops(self, crops, name):
+        """Write crops from detect_array under output_dir/name and return their paths"""
+        image_output_dir = os.path.join(self.output_dir, name)
+        os.makedirs(image_output_dir, exist_ok=True)
+
+        output_filenames = []
+        for i, crop in enumerate(crops):
+            output_filename = f"{image_output_dir}/{crop['class']}_{i}_conf_{crop['confidence']:.2f}.jpg"
+            cv2.imwrite(output_filename, crop['image'], [cv2.IMWRITE_JPEG_QUALITY, 100])
+            print(f"Saved: {output_filename}")
+            output_filenames.append(output_filename)
+        return output_filenames
+
+    def detect_dir(self, directory, batch_size=8):
+        # Decoding of the next batch overlaps with inference on the current one
+        for names, frames in iter_batches(list_images(directory), batch_size):
+            for name, weapon_crops in zip(names, self.detect_batch(frames)):
+                if weapon_crops:
+                    self.save_crops(weapon_crops, os.path.basename(name))
+                else:
+                    print(f"No weapons detected in {name}")
+
+    @metrics.timed('weapon_detect_file')
     def detect(self, filepath):
-        weapon_crops = self._detect(filepath)
+        orig_img = cv2.imread(filepath)
+        if orig_img is None:
+            raise ValueError(f"Could not read image: {filepath}")
+        weapon_crops = self.detect_array(orig_img)
 
         if weapon_crops:
             filename = os.path.basename(filepath)
-            image_output_dir = os.path.join(self.output_dir, filename)
-            os.makedirs(image_output_dir, exist_ok=True)
-
-            output_filenames = []
-            for i, (cropped, confidence, weapon_name) in enumerate(weapon_crops):
-                if cropped.shape[0] < 10 or cropped.shape[1] < 10:
-                    print(f"Skipping weapon {i} - too small")
-                    continue
-                output_filename = f"{image_output_dir}/{weapon_name}_{i}_conf_{confidence:.2f}.jpg"
-                cv2.imwrite(output_filename, cropped, [cv2.IMWRITE_JPEG_QUALITY, 100])
-                print(f"Saved: {output_filename}")
-                output_filenames.append(output_filename)
-            return output_filenames
+            return self.save_crops(weapon_crops, filename)
         else:
             print(f"No weapons detected in {filepath}")